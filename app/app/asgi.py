@@ -0,0 +1,24 @@
+"""
+ASGI config for app project.
+
+Django 2.1 has no ASGI handler of its own, so the WSGI application is
+wrapped with asgiref and served from a bounded pool of bridge threads, see
+core.asgi.ThreadPoolBridge. Serve it with uvicorn workers under gunicorn,
+see app/gunicorn_conf.py.
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import ThreadPoolBridge
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = ThreadPoolBridge(
+    WsgiToAsgi(get_wsgi_application()),
+    threads=settings.ASGI_THREADS,
+    max_pending=settings.ASGI_MAX_PENDING,
+)
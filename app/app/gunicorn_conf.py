@@ -0,0 +1,121 @@
+"""
+Gunicorn settings for serving the API in production.
+
+Sync workers (WSGI):
+
+    gunicorn -c python:app.gunicorn_conf app.wsgi
+
+Threaded workers (WSGI), sharing a database pool per worker:
+
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c python:app.gunicorn_conf \\
+        app.wsgi
+
+Async workers (ASGI):
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \\
+        gunicorn -c python:app.gunicorn_conf app.asgi:application
+
+Every setting can be overridden from the environment, see below. Workers
+and threads default to sizes derived from the CPU count; the app is
+preloaded in the master so workers share its memory copy-on-write, and
+workers are recycled after a jittered number of requests to bound memory
+growth. More than one worker needs the caches shared between processes,
+see on_starting below.
+"""
+
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+
+if worker_class == 'gthread':
+    workers = _env_int('GUNICORN_WORKERS', cpus + 1)
+    threads = _env_int('GUNICORN_THREADS', 4)
+    request_threads = threads
+elif worker_class == 'sync':
+    workers = _env_int('GUNICORN_WORKERS', cpus * 2 + 1)
+    threads = 1
+    request_threads = 1
+else:
+    # Async workers multiplex connections, one per CPU is enough; requests
+    # run on the ASGI_THREADS bridge threads of each worker
+    workers = _env_int('GUNICORN_WORKERS', cpus)
+    threads = 1
+    request_threads = _env_int('ASGI_THREADS', 8)
+
+# Give each thread serving requests a connection from the database pool
+if request_threads > 1:
+    os.environ.setdefault('DB_POOL_SIZE', str(request_threads))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true') == 'true'
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Heartbeat files on tmpfs, so a slow container disk cannot stall workers
+worker_tmp_dir = os.environ.get('GUNICORN_WORKER_TMP_DIR', '/dev/shm')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def per_process_caches():
+    """
+    Return the caches that keep their state inside each process. With more
+    than one worker, writes seen by one worker would not invalidate cached
+    responses, replica pins or throttle history in the others
+    """
+    from django.conf import settings
+    from django.core.cache import caches
+
+    def local(alias):
+        return caches[alias].__class__.__name__ == 'LocMemCache'
+
+    found = []
+    if local('default'):
+        found.append("CACHES['default']")
+    backend = settings.RECIPE_CACHE['BACKEND']
+    options = settings.RECIPE_CACHE.get('OPTIONS', {})
+    if backend == 'recipe.cache.LocMemBackend' or (
+            backend == 'recipe.cache.DjangoCacheBackend' and
+            local(options.get('CACHE_ALIAS', 'default'))):
+        found.append('RECIPE_CACHE')
+    return found
+
+
+def on_starting(server):
+    """
+    Refuse to start several workers while a per-process cache is selected.
+    Set GUNICORN_ALLOW_LOCAL_CACHES=true to start anyway, e.g. to benchmark
+    read-only traffic
+    """
+    if server.cfg.workers <= 1 or \
+            os.environ.get('GUNICORN_ALLOW_LOCAL_CACHES') == 'true':
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    found = per_process_caches()
+    if found:
+        raise RuntimeError(
+            '%s keep state per process and cannot be used with %d workers; '
+            'configure a shared cache (DJANGO_CACHE_BACKEND and '
+            'RECIPE_CACHE_BACKEND=recipe.cache.DjangoCacheBackend) or set '
+            'GUNICORN_WORKERS=1' % (', '.join(found), server.cfg.workers))
+
+
+def post_fork(server, worker):
+    """
+    Drop any database connection inherited from the preloaded master
+    """
+    from django.db import connections
+    connections.close_all()
@@ -20,12 +20,14 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'n6sv-8if4g-n%rc4#ad9w#m_rw8d8a_yw)d%8c0+24l*^)ha*^'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'n6sv-8if4g-n%rc4#ad9w#m_rw8d8a_yw)d%8c0+24l*^)ha*^')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'true') == 'true'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = list(
+    filter(None, os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')))
 
 
 # Application definition
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -46,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.instrumentation.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,16 +82,87 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are checked once per
+# request before reuse. Setting DB_POOL_SIZE shares that many connections
+# between the threads of each worker process instead; connections then go
+# back to the pool at the end of every request
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS':
+            os.environ.get('DB_CONN_HEALTH_CHECKS', 'true') == 'true',
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        },
     }
 }
 
+# Read replicas, one per host in DB_REPLICA_HOSTS. Safe-method API requests
+# read from a replica unless the user wrote within DB_REPLICA_PIN_SECONDS;
+# pins live in the default cache, which must be shared across processes
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = 'replica_%d' % index
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(),
+                            TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+# /readyz also checks that migrations are applied, once per process
+
+READINESS_CHECK_MIGRATIONS = \
+    os.environ.get('READINESS_CHECK_MIGRATIONS', 'true') == 'true'
+
+# ASGI serving (app/asgi.py): requests run on ASGI_THREADS bridge threads
+# per worker; once ASGI_MAX_PENDING more are waiting, new ones get a 503
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 1000))
+
+
+# Password hashing
+# PASSWORD_HASHER selects the hasher used for new passwords; passwords
+# stored with any other listed hasher, or with different cost settings, are
+# rehashed on the next successful login. argon2 needs argon2-cffi and
+# bcrypt needs bcrypt installed.
+
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'core.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in sorted(PASSWORD_HASHER_CHOICES.items())
+    if name != PASSWORD_HASHER
+]
+
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 120000))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 512))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 2))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+# Hashes run on a pool of PASSWORD_HASH_WORKERS threads (default: one per
+# CPU). Up to PASSWORD_HASH_QUEUE more wait for a worker; beyond that a
+# login waits PASSWORD_HASH_TIMEOUT seconds before getting a 503.
+if os.environ.get('PASSWORD_HASH_WORKERS'):
+    PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS'])
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -128,3 +203,80 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# Caches
+# The default cache is per process. Servers running several processes
+# should point it at a shared cache, e.g. memcached with
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# and DJANGO_CACHE_LOCATION=cache:11211
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    },
+}
+
+
+# Response cache for tag and ingredient lists
+# Use recipe.cache.DjangoCacheBackend to share it between processes
+
+RECIPE_CACHE = {
+    'BACKEND': os.environ.get(
+        'RECIPE_CACHE_BACKEND', 'recipe.cache.LocMemBackend'),
+    'OPTIONS': {},
+}
+
+
+# Cached token authentication
+# Set TOKEN_AUTH_CACHE_ALIAS to a cache in CACHES to share it between
+# processes; the in-process copy always expires after TIMEOUT seconds
+
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS'),
+}
+
+
+# Django REST Framework
+# Throttle history lives in the default cache; point CACHES['default'] at a
+# shared cache so limits apply across processes
+
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.environ.get('THROTTLE_RATE_LOGIN', '30/min'),
+        'login_failure': os.environ.get(
+            'THROTTLE_RATE_LOGIN_FAILURE', '5/min'),
+        'user_create': os.environ.get('THROTTLE_RATE_USER_CREATE', '20/hour'),
+    },
+}
+
+# Per-request query and timing instrumentation. A fraction of requests,
+# from 0 (off) to 1 (all), get a Server-Timing header and a JSON log line;
+# statements repeated DUPLICATE_THRESHOLD times are logged as warnings
+
+QUERY_INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.environ.get('QUERY_SAMPLE_RATE', 0)),
+    'DUPLICATE_THRESHOLD': int(
+        os.environ.get('QUERY_DUPLICATE_THRESHOLD', 3)),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
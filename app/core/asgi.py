@@ -0,0 +1,83 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+
+async def _send_json(send, status, data, headers=()):
+    body = json.dumps(data).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class ThreadPoolBridge:
+    """
+    ASGI middleware in front of the WSGI-wrapped Django application.
+
+    Django 2.1 views and ORM calls are synchronous, so each request runs on
+    one of threads bridge threads while the event loop keeps accepting
+    connections. A slow query holds a bridge thread, not a server worker.
+    Once threads + max_pending requests are in flight, further requests
+    are answered 503 from the event loop instead of queueing without bound.
+    Liveness probes are answered on the event loop without a thread
+    """
+
+    def __init__(self, application, threads, max_pending,
+                 live_paths=('/healthz',)):
+        self.application = application
+        self.threads = threads
+        self.max_in_flight = threads + max_pending
+        self.live_paths = set(live_paths)
+        self.in_flight = 0
+        self.shed = 0
+        self._loop = None
+
+    def _bind_executor(self):
+        """
+        Size the running loop's default executor, which the WSGI adapter
+        runs requests on, the first time each loop serves a request
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            loop.set_default_executor(ThreadPoolExecutor(
+                self.threads, thread_name_prefix='asgi-bridge'))
+            self._loop = loop
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+
+        if scope['path'] in self.live_paths:
+            return await _send_json(send, 200, {'status': 'ok'})
+
+        if self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            return await _send_json(
+                send, 503, {'detail': 'Server busy, try again shortly'},
+                headers=[(b'retry-after', b'1')])
+
+        self._bind_executor()
+        self.in_flight += 1
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._bind_executor()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
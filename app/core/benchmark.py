@@ -0,0 +1,204 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+PERF_EMAIL_DOMAIN = 'perf.example.com'
+PERF_PASSWORD = 'perf-password'
+
+
+def perf_email(prefix, index):
+    """
+    Return the email of the index-th synthetic user for a prefix
+    """
+    return '%s-%d@%s' % (prefix, index, PERF_EMAIL_DOMAIN)
+
+
+def count_range(value):
+    """
+    Parse "N" or "MIN-MAX" into a (min, max) tuple, for use as an argparse
+    type
+    """
+    low, _, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise ValueError('Expected N or MIN-MAX, got %r' % value)
+    if low < 0 or high < low:
+        raise ValueError('Expected 0 <= MIN <= MAX, got %r' % value)
+    return low, high
+
+
+def draw(rng, bounds):
+    """
+    Draw a count uniformly from a (min, max) tuple
+    """
+    return rng.randint(*bounds)
+
+
+def percentile(values, pct):
+    """
+    Return the nearest-rank percentile of a list of numbers
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(timings, queries, errors, elapsed):
+    """
+    Reduce per-request timings in seconds and query counts to the figures
+    reported for a scenario. Query figures are None when queries is empty
+    """
+    millis = [value * 1000 for value in timings]
+    count = len(timings)
+    return {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(millis, 50), 3) if count else None,
+        'p95_ms': round(percentile(millis, 95), 3) if count else None,
+        'p99_ms': round(percentile(millis, 99), 3) if count else None,
+        'mean_ms': round(sum(millis) / count, 3) if count else None,
+        'queries_per_request':
+            round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+    }
+
+
+def end_request():
+    """
+    Release database connections as a server does between requests, so
+    CONN_MAX_AGE and pool settings show in the timings. The test client
+    skips this, and it is skipped inside transactions, as in tests
+    """
+    for conn in connections.all():
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
+def connection_settings():
+    """
+    Describe the connection handling of each database, to tell benchmark
+    runs apart
+    """
+    return {
+        conn.alias: {
+            'vendor': conn.vendor,
+            'conn_max_age': conn.settings_dict['CONN_MAX_AGE'],
+            'health_checks': conn.settings_dict.get(
+                'CONN_HEALTH_CHECKS', False),
+            'pool_size': (conn.settings_dict.get('POOL') or {}).get('SIZE'),
+        }
+        for conn in connections.all()
+    }
+
+
+def explain(sql):
+    """
+    Return the query plan of a captured SELECT as a list of lines, or None
+    on databases without a supported EXPLAIN
+    """
+    prefix = {
+        'postgresql': 'EXPLAIN ',
+        'sqlite': 'EXPLAIN QUERY PLAN ',
+    }.get(connection.vendor)
+    if prefix is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        return [' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def hash_throughput(count, workers):
+    """
+    Time count password hashes with the default hasher, first one at a
+    time on the calling thread and then from workers threads at once, and
+    report hashes per second overall and per core
+    """
+    from core.hashers import PooledHasherMixin
+
+    hasher = get_hasher()
+    # Pooled hashers hand encode to the pool; time the inline cost too
+    inline = super(PooledHasherMixin, hasher) \
+        if isinstance(hasher, PooledHasherMixin) else hasher
+    salt = hasher.salt()
+
+    started = time.perf_counter()
+    for index in range(count):
+        inline.encode('password-%d' % index, salt)
+    inline_elapsed = time.perf_counter() - started
+
+    with ThreadPoolExecutor(workers) as executor:
+        started = time.perf_counter()
+        list(executor.map(lambda index: hasher.encode(
+            'password-%d' % index, salt), range(count)))
+        parallel_elapsed = time.perf_counter() - started
+
+    cores = min(workers, os.cpu_count() or 1)
+    parallel_rate = count / parallel_elapsed
+    return {
+        'hasher': hasher.algorithm,
+        'hashes': count,
+        'workers': workers,
+        'cpus': os.cpu_count(),
+        'inline_per_second': round(count / inline_elapsed, 2),
+        'parallel_per_second': round(parallel_rate, 2),
+        'per_core_per_second': round(parallel_rate / cores, 2),
+    }
+
+
+class Scenario:
+    """
+    A named request against the API, made in-process through a test client
+    """
+
+    def __init__(self, name, request):
+        self.name = name
+        self.request = request
+
+    def explain(self, client, user):
+        """
+        Make one request and return the plan of every SELECT it ran
+        """
+        with CaptureQueriesContext(connection) as captured:
+            self.request(client, user)
+        end_request()
+        return [
+            {'sql': query['sql'], 'plan': explain(query['sql'])}
+            for query in captured
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def run(self, client, users, iterations, warmup=0, before=None):
+        """
+        Make warmup + iterations requests, rotating through the users, and
+        return the summary of the measured ones
+        """
+        for index in range(warmup):
+            self.request(client, users[index % len(users)])
+            end_request()
+
+        timings, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for index in range(iterations):
+            user = users[index % len(users)]
+            if before is not None:
+                before(user)
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = self.request(client, user)
+                timings.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            end_request()
+            if response.status_code >= 400:
+                errors += 1
+        return summarize(timings, queries, errors,
+                         time.perf_counter() - started)
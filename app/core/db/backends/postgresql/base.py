@@ -0,0 +1,120 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import Database
+
+from core.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+TRANSACTION_STATUS_IDLE = Database.extensions.TRANSACTION_STATUS_IDLE
+
+
+def _usable(connection):
+    """
+    Check a raw psycopg2 connection with a round trip, leaving it idle
+    """
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Database.Error:
+        return False
+    return True
+
+
+def _open(connection):
+    return not connection.closed
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that checks persistent connections before their
+    first use in each request (CONN_HEALTH_CHECKS) and can share a pool of
+    POOL['SIZE'] connections between the threads of a worker process
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_pool(self, conn_params=None):
+        """
+        Return the connection pool of this alias, or None when disabled
+        """
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('SIZE'):
+            return None
+        if conn_params is None:
+            conn_params = self.get_connection_params()
+        return get_pool(self.alias, lambda: ConnectionPool(
+            partial(Database.connect, **conn_params),
+            size=options['SIZE'],
+            timeout=options.get('TIMEOUT', 5),
+            check=_usable if self.health_checks else _open,
+        ))
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc))
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def connect(self):
+        # A connection just opened needs no check. Mark it before connecting,
+        # as connect() calls ensure_connection() while setting autocommit
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        """
+        Check a reused connection once per request before running queries
+        on it, reconnecting if the server dropped it
+        """
+        if (self.connection is not None and not self.health_check_done and
+                self.health_checks and not self.in_atomic_block):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        """
+        Run at the start and end of each request: arm the health check and,
+        with a pool, hand the connection back to it
+        """
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+        if self.connection is not None and not self.in_atomic_block and \
+                self.get_pool() is not None:
+            self.close()
+
+    def _close(self):
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        connection = self.connection
+        discard = self.errors_occurred or connection.closed
+        if not discard and \
+                connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Database.Error:
+                discard = True
+        pool.release(connection, discard=discard)
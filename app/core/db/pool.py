@@ -0,0 +1,136 @@
+import threading
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled connection becomes free in time
+    """
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of at most size database connections, shared by the
+    threads of one worker process. Idle connections are handed out most
+    recently used first, and checked before reuse when check is given
+    """
+
+    def __init__(self, connect, size, timeout=5, check=None):
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._check = check
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.discarded = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        """
+        Return an idle connection or open a new one, waiting up to timeout
+        seconds when all size connections are in use
+        """
+        with self._lock:
+            self.waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(
+                'No database connection free after %ss (pool size %d)'
+                % (self.timeout, self.size))
+
+        try:
+            connection = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return connection
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+                with self._lock:
+                    self.created += 1
+                return connection
+            if self._check is None or self._check(connection):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, discard=False):
+        """
+        Return a connection to the pool, or close it when discard is set
+        """
+        if discard:
+            self._discard(connection)
+        else:
+            with self._lock:
+                self._idle.append(connection)
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.discarded += 1
+
+    def close(self):
+        """
+        Close every idle connection
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'utilization': round(self.in_use / self.size, 3),
+                'created': self.created,
+                'discarded': self.discarded,
+                'timeouts': self.timeouts,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, factory):
+    """
+    Return the pool of a database alias, creating it with factory on first
+    use
+    """
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = factory()
+        return _pools[alias]
+
+
+def pool_stats(alias):
+    """
+    Return the stats of a database alias's pool, or None without one
+    """
+    pool = _pools.get(alias)
+    return pool.stats() if pool is not None else None
@@ -0,0 +1,85 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def _pin_key(user_id):
+    return 'db:pinned:%s' % user_id
+
+
+def pin_user(user_id):
+    """
+    Send a user's reads to the primary for REPLICA_PIN_SECONDS, so they see
+    their own writes before the replicas catch up
+    """
+    cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def current_replica():
+    """
+    Return the replica alias chosen for the current request, if any
+    """
+    return getattr(_state, 'replica', None)
+
+
+class ReplicaRouter:
+    """
+    Route reads made while a request is marked as a replica read to the
+    replica picked for it, and everything else to the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe-method requests from a replica, unless the user wrote
+    recently, and pin users to the primary after a successful write
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        replicas = settings.DATABASE_REPLICAS
+        user_id = request.user.pk
+        if replicas and request.method in SAFE_METHODS and \
+                not (user_id and is_pinned(user_id)):
+            _state.replica = random.choice(replicas)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if settings.DATABASE_REPLICAS and \
+                request.method not in SAFE_METHODS and \
+                response.status_code < 400 and request.user.is_authenticated:
+            pin_user(request.user.pk)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _state.replica = None
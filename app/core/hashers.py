@@ -0,0 +1,133 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher)
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HasherBusy(APIException):
+    """
+    Raised when the hashing pool is saturated and a hash could not be
+    started within PASSWORD_HASH_TIMEOUT
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many sign-in attempts, try again shortly.')
+    default_code = 'hasher_busy'
+
+
+class HasherPool:
+    """
+    A fixed set of worker threads that run password hashes, so CPU-heavy
+    hashing is capped at a known concurrency instead of running on every
+    request thread at once. Callers beyond the workers plus a bounded
+    queue wait up to the timeout for a slot, then get HasherBusy
+    """
+
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._local = threading.local()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so forked server workers each start their own
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='password-hasher',
+                    initializer=self._mark_worker,
+                )
+            return self._executor
+
+    def _mark_worker(self):
+        self._local.in_pool = True
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run fn on the pool and return its result. Calls made from inside
+        the pool, or with no workers configured, run inline
+        """
+        if self.workers < 1 or getattr(self._local, 'in_pool', False):
+            return fn(*args, **kwargs)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy()
+        try:
+            return self._get_executor().submit(fn, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+
+def _build_pool():
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return HasherPool(
+        workers=workers,
+        queue_size=getattr(settings, 'PASSWORD_HASH_QUEUE', workers * 4),
+        timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 5),
+    )
+
+
+hasher_pool = _build_pool()
+
+
+class PooledHasherMixin:
+    """
+    Run encode and verify on the hashing pool
+    """
+
+    def encode(self, *args, **kwargs):
+        return hasher_pool.run(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return hasher_pool.run(super().verify, *args, **kwargs)
+
+
+class TunedPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from settings. Hashes made
+    with a different count are upgraded on the next successful login
+    """
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """
+    Argon2 with its cost parameters taken from settings. Requires the
+    argon2-cffi package
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class TunedBCryptSHA256PasswordHasher(PooledHasherMixin,
+                                      BCryptSHA256PasswordHasher):
+    """
+    BCrypt-SHA256 with the work factor taken from settings. Requires the
+    bcrypt package
+    """
+
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
@@ -0,0 +1,80 @@
+import random
+import time
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class NotReady(Exception):
+    """
+    Raised when a database cannot serve requests yet
+    """
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """
+    Run SELECT 1 on a database, which opens the connection if needed
+    """
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as exc:
+        raise NotReady('Database %s unavailable: %s' % (alias, exc))
+
+
+def check_migrations(alias=DEFAULT_DB_ALIAS):
+    """
+    Make sure every known migration has been applied to a database
+    """
+    try:
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    except DatabaseError as exc:
+        raise NotReady('Migrations of %s unavailable: %s' % (alias, exc))
+    if plan:
+        raise NotReady('%d migrations not applied to %s' % (len(plan), alias))
+
+
+_migrated = set()
+
+
+def check_ready(alias=DEFAULT_DB_ALIAS, migrations=False):
+    """
+    Check a database is reachable and, optionally, migrated. Migrations
+    are only checked until they have been seen applied once per process
+    """
+    check_database(alias)
+    if migrations and alias not in _migrated:
+        check_migrations(alias)
+        _migrated.add(alias)
+
+
+def backoff_delays(base, maximum):
+    """
+    Yield exponentially growing delays, capped at maximum, with full jitter
+    """
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(maximum, base * 2 ** attempt))
+        attempt += 1
+
+
+def wait_until_ready(alias=DEFAULT_DB_ALIAS, timeout=60, migrations=False,
+                     base_delay=0.1, max_delay=5, on_retry=None):
+    """
+    Retry check_ready with backoff until it passes, raising the last
+    NotReady once timeout seconds have passed
+    """
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays(base_delay, max_delay):
+        try:
+            return check_ready(alias, migrations)
+        except NotReady as exc:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+            delay = min(delay, remaining)
+            if on_retry is not None:
+                on_retry(exc, delay)
+            time.sleep(delay)
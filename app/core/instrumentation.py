@@ -0,0 +1,164 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.instrumentation')
+
+_state = threading.local()
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape, so queries differing only in their
+    parameters, literal numbers or IN list lengths compare equal
+    """
+    sql = _PLACEHOLDER_LIST.sub('(%s...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestStats:
+    """
+    Timings and queries recorded for a single sampled request
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.statements = Counter()
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        """
+        Database execute wrapper counting and timing every statement
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[normalize_sql(sql)] += 1
+
+    def duplicates(self, threshold):
+        """
+        Return the statements run at least threshold times, most first
+        """
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def current_stats():
+    """
+    Return the stats of the request being sampled on this thread, if any
+    """
+    return getattr(_state, 'stats', None)
+
+
+class TimedSerializerMixin:
+    """
+    Count the time spent turning objects into primitives towards the
+    sampled request's serializer time. Nested serializers are only
+    counted once, through the outermost one
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serialize_time += time.perf_counter() - started
+            stats.serializing = False
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the query count, SQL time, serializer time and render time of a
+    sample of requests, report them in a Server-Timing header and a JSON
+    log line, and warn about statements repeated often enough to suggest an
+    N+1 pattern. Requests outside the sample are passed straight through
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.QUERY_INSTRUMENTATION
+        rate = config['SAMPLE_RATE']
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        stats = _state.stats = RequestStats()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute))
+                response = self.get_response(request)
+        finally:
+            _state.stats = None
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.2f;desc="%d queries"' % (
+                stats.sql_time * 1000, stats.queries),
+            'serialize;dur=%.2f' % (stats.serialize_time * 1000),
+            'render;dur=%.2f' % (stats.render_time * 1000),
+            'total;dur=%.2f' % (total * 1000),
+        ])
+
+        duplicates = stats.duplicates(config['DUPLICATE_THRESHOLD'])
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.queries,
+            'sql_ms': round(stats.sql_time * 1000, 2),
+            'serialize_ms': round(stats.serialize_time * 1000, 2),
+            'render_ms': round(stats.render_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'duplicates': duplicates,
+        }
+        if duplicates:
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Time the rendering of DRF responses, which happens after the view
+        returns
+        """
+        stats = current_stats()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
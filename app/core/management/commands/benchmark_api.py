@@ -0,0 +1,204 @@
+import json
+import platform
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.benchmark import PERF_EMAIL_DOMAIN, PERF_PASSWORD, Scenario, \
+    connection_settings, hash_throughput
+from core.hashers import hasher_pool
+from core.models import Tag, Ingredient, Recipe
+from recipe import views as recipe_views
+from recipe.cache import response_cache
+from user import views as user_views
+
+# Views authenticated with CachedTokenAuthentication, switched to DRF's
+# TokenAuthentication by --auth stock
+CACHED_AUTH_VIEWS = (
+    recipe_views.BaseRecipeAttrViewSet,
+    recipe_views.RecipeViewSet,
+    user_views.ManageUserView,
+)
+
+
+def _get(url_name, **params):
+    def request(client, user):
+        query = {key: value(user) if callable(value) else value
+                 for key, value in params.items()}
+        return client.get(reverse(url_name), query,
+                          HTTP_AUTHORIZATION='Token ' + user['token'])
+    return request
+
+
+def _recipe_detail(client, user):
+    return client.get(
+        reverse('recipe:recipe-detail', args=[user['recipe_id']]),
+        HTTP_AUTHORIZATION='Token ' + user['token'])
+
+
+def _token(client, user):
+    return client.post(reverse('user:token'), {
+        'email': user['email'], 'password': user['password']})
+
+
+SCENARIOS = [
+    Scenario('tags_list', _get('recipe:tag-list')),
+    Scenario('tags_assigned', _get('recipe:tag-list', assigned_only=1)),
+    Scenario('ingredients_list', _get('recipe:ingredient-list')),
+    Scenario('recipes_list', _get('recipe:recipe-list')),
+    Scenario('recipes_filter_tags',
+             _get('recipe:recipe-list', tags=lambda user: user['tag_id'])),
+    Scenario('recipes_filter_all',
+             _get('recipe:recipe-list', match='all',
+                  tags=lambda user: user['tag_id'],
+                  ingredients=lambda user: user['ingredient_id'])),
+    Scenario('recipes_search',
+             _get('recipe:recipe-list', search='chicken')),
+    Scenario('recipe_detail', _recipe_detail),
+    Scenario('token', _token),
+    Scenario('profile', _get('user:profile')),
+]
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark the API in-process against the users
+    created by seed_perf_data, writing the results as JSON.
+
+    Run it with --auth stock and --auth cached to compare token
+    authentication, --hashes N to add password hashing rates per core,
+    and --explain to add the query plans of each scenario, e.g. after
+    seeding 100k recipes
+    """
+    help = 'Benchmark the API endpoints and report latency and query counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Unmeasured requests per scenario')
+        parser.add_argument('--prefix', default='perf',
+                            help='Email prefix of the seeded users')
+        parser.add_argument('--password', default=PERF_PASSWORD,
+                            help='Password of the seeded users')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of seeded users to rotate through')
+        parser.add_argument('--scenario', dest='scenarios', action='append',
+                            choices=[scenario.name for scenario in SCENARIOS],
+                            help='Run only this scenario, may be repeated')
+        parser.add_argument('--cold-cache', dest='cold_cache',
+                            action='store_true',
+                            help='Clear the response cache before every '
+                                 'measured request')
+        parser.add_argument('--throttle', action='store_true',
+                            help='Keep the login and sign-up throttles on')
+        parser.add_argument('--auth', choices=('cached', 'stock'),
+                            default='cached',
+                            help='Token authentication class to use')
+        parser.add_argument('--hashes', type=int, default=0,
+                            help='Also time this many password hashes')
+        parser.add_argument('--explain', action='store_true',
+                            help='Also report the plan of every query')
+        parser.add_argument('--output', help='Write the JSON report here '
+                                             'instead of to stdout')
+
+    def handle(self, *args, **options):
+        users = self.load_users(options)
+        names = options['scenarios']
+        scenarios = [scenario for scenario in SCENARIOS
+                     if not names or scenario.name in names]
+        before = (lambda user: response_cache.clear()) \
+            if options['cold_cache'] else None
+
+        results = {}
+        with ExitStack() as stack:
+            stack.enter_context(override_settings(
+                ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']))
+            if not options['throttle']:
+                for view in (user_views.CreateUserView,
+                             user_views.CreateTokenView):
+                    stack.enter_context(
+                        mock.patch.object(view, 'throttle_classes', ()))
+            if options['auth'] == 'stock':
+                for view in CACHED_AUTH_VIEWS:
+                    stack.enter_context(mock.patch.object(
+                        view, 'authentication_classes',
+                        (TokenAuthentication,)))
+
+            client = APIClient()
+            for scenario in scenarios:
+                self.stderr.write('Running %s...' % scenario.name)
+                results[scenario.name] = scenario.run(
+                    client, users, options['iterations'],
+                    warmup=options['warmup'], before=before)
+                if options['explain']:
+                    results[scenario.name]['plans'] = scenario.explain(
+                        client, users[0])
+
+        report = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'connections': connection_settings(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'users': len(users),
+                'recipes': Recipe.objects.count(),
+                'auth': options['auth'],
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'cold_cache': options['cold_cache'],
+            },
+            'scenarios': results,
+        }
+        if options['hashes']:
+            self.stderr.write('Timing password hashes...')
+            report['hashing'] = hash_throughput(
+                options['hashes'], max(hasher_pool.workers, 1))
+        report = json.dumps(report, indent=2, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def load_users(self, options):
+        """
+        Return the seeded users with a token and a sample recipe, tag and
+        ingredient
+        """
+        queryset = get_user_model().objects.filter(
+            email__startswith='%s-' % options['prefix'],
+            email__endswith='@' + PERF_EMAIL_DOMAIN,
+        ).order_by('id')[:options['users']]
+
+        users = []
+        for user in queryset:
+            token, _ = Token.objects.get_or_create(user=user)
+            recipe = Recipe.objects.filter(user=user).order_by('id').first()
+            tag = Tag.objects.filter(user=user).order_by('id').first()
+            ingredient = Ingredient.objects.filter(
+                user=user).order_by('id').first()
+            users.append({
+                'email': user.email,
+                'password': options['password'],
+                'token': token.key,
+                'recipe_id': recipe.pk if recipe else 0,
+                'tag_id': tag.pk if tag else 0,
+                'ingredient_id': ingredient.pk if ingredient else 0,
+            })
+        if not users:
+            raise CommandError('No seeded users found, run seed_perf_data')
+        return users
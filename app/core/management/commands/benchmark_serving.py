@@ -0,0 +1,211 @@
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from core.benchmark import PERF_EMAIL_DOMAIN, summarize
+from core.health import backoff_delays
+
+GUNICORN = [sys.executable, '-m', 'gunicorn', '-c', 'python:app.gunicorn_conf']
+
+# name: (command line for a bind address, extra environment, modules)
+MODES = {
+    'runserver': (
+        lambda bind: [sys.executable, 'manage.py', 'runserver',
+                      '--noreload', bind],
+        {}, (),
+    ),
+    'sync': (
+        lambda bind: GUNICORN + ['--bind', bind, 'app.wsgi'],
+        {'GUNICORN_WORKER_CLASS': 'sync'}, ('gunicorn',),
+    ),
+    'async': (
+        lambda bind: GUNICORN + ['--bind', bind, 'app.asgi:application'],
+        {'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker'},
+        ('gunicorn', 'uvicorn', 'asgiref'),
+    ),
+}
+
+
+class Command(BaseCommand):
+    """
+    Django command to compare serving modes by starting each server in turn
+    and timing concurrent requests to the recipe list over HTTP, e.g. with
+    --concurrency 1000. Expects the database to hold users created by
+    seed_perf_data
+    """
+    help = 'Benchmark the recipe list under runserver, sync and async workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', dest='modes', action='append',
+                            choices=sorted(MODES),
+                            help='Serving mode to run, may be repeated')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Measured requests per mode')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Requests in flight at once')
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds before a request counts as failed')
+        parser.add_argument('--bind', default='127.0.0.1:8765',
+                            help='Address the servers listen on')
+        parser.add_argument('--prefix', default='perf',
+                            help='Email prefix of the seeded users')
+        parser.add_argument('--startup-timeout', dest='startup_timeout',
+                            type=float, default=30,
+                            help='Seconds to wait for a server to start')
+        parser.add_argument('--output', help='Write the JSON report here '
+                                             'instead of to stdout')
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or sorted(MODES)
+        missing = sorted({
+            module for mode in modes for module in MODES[mode][2]
+            if importlib.util.find_spec(module) is None
+        })
+        if missing:
+            raise CommandError('Install %s to run these modes'
+                               % ', '.join(missing))
+
+        user = get_user_model().objects.filter(
+            email__startswith='%s-' % options['prefix'],
+            email__endswith='@' + PERF_EMAIL_DOMAIN,
+        ).order_by('id').first()
+        if user is None:
+            raise CommandError('No seeded users found, run seed_perf_data')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        results = {}
+        for mode in modes:
+            self.stderr.write('Running %s...' % mode)
+            results[mode] = self.run_mode(mode, token.key, options)
+
+        report = json.dumps({
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'endpoint': '/api/recipe/recipes/',
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'timeout': options['timeout'],
+                'cpus': os.cpu_count(),
+            },
+            'modes': results,
+        }, indent=2, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run_mode(self, mode, token, options):
+        command, env, _ = MODES[mode]
+        bind = options['bind']
+        server = subprocess.Popen(
+            command(bind), cwd=settings.BASE_DIR,
+            # No access log, and no worker recycling in the middle of a run.
+            # The runs only read, so per-process caches cannot go stale
+            env=dict(os.environ, GUNICORN_ACCESS_LOG='',
+                     GUNICORN_MAX_REQUESTS='0',
+                     GUNICORN_ALLOW_LOCAL_CACHES='true', **env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base_url = 'http://%s' % bind
+            self.wait_for_server(server, base_url,
+                                 options['startup_timeout'])
+            return self.load(base_url + '/api/recipe/recipes/', token,
+                             options['requests'], options['concurrency'],
+                             options['timeout'])
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    @staticmethod
+    def wait_for_server(server, base_url, timeout):
+        deadline = time.monotonic() + timeout
+        for delay in backoff_delays(0.05, 1):
+            if server.poll() is not None:
+                raise CommandError('Server exited with status %d'
+                                   % server.returncode)
+            try:
+                urllib.request.urlopen(base_url + '/healthz', timeout=5)
+                return
+            except (urllib.error.URLError, ConnectionError):
+                if time.monotonic() > deadline:
+                    raise CommandError('Server did not start in %ss'
+                                       % timeout)
+                time.sleep(delay)
+
+    @staticmethod
+    def load(url, token, count, concurrency, timeout):
+        """
+        Make count requests, concurrency at a time, from one event loop so
+        thousands of clients can be simulated, and summarize them
+        """
+        parts = urllib.parse.urlsplit(url)
+        request = (
+            'GET %s HTTP/1.1\r\nHost: %s\r\nAuthorization: Token %s\r\n'
+            'Connection: close\r\n\r\n' % (parts.path, parts.netloc, token)
+        ).encode()
+
+        async def get():
+            reader, writer = await asyncio.open_connection(
+                parts.hostname, parts.port)
+            try:
+                writer.write(request)
+                status_line = await reader.readline()
+                length = None
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b''):
+                        break
+                    name, _, value = header.partition(b':')
+                    if name.strip().lower() == b'content-length':
+                        length = int(value)
+                # Servers may hold the socket open after the response, so
+                # read by length rather than waiting for the connection to
+                # close when the length is known
+                if length is None:
+                    await reader.read()
+                else:
+                    await reader.readexactly(length)
+            finally:
+                writer.close()
+            return status_line.split()[1:2] == [b'200']
+
+        async def fetch(slots):
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    ok = await asyncio.wait_for(get(), timeout)
+                except (OSError, ValueError, asyncio.TimeoutError,
+                        asyncio.IncompleteReadError):
+                    ok = False
+                return time.perf_counter() - started, ok
+
+        async def run():
+            slots = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *[fetch(slots) for _ in range(count)])
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        return summarize([timing for timing, _ in results], [],
+                         sum(1 for _, ok in results if not ok), elapsed)
@@ -0,0 +1,328 @@
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import response_cache
+from recipe.export import NAME_SEPARATOR
+from recipe.search import update_search_vectors
+
+
+def read_ndjson(stream):
+    """
+    Yield a dict for every non-blank line of a NDJSON stream
+    """
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise CommandError('Line %d: invalid JSON (%s)' % (line_no, exc))
+        if not isinstance(row, dict):
+            raise CommandError('Line %d: expected a JSON object' % line_no)
+        yield row
+
+
+def read_csv(stream):
+    """
+    Yield a dict for every CSV row, splitting the tag and ingredient columns
+    into lists of names
+    """
+    for row in csv.DictReader(stream):
+        for field in ('tags', 'ingredients'):
+            value = row.get(field) or ''
+            row[field] = [name for name in value.split(NAME_SEPARATOR)
+                          if name]
+        yield row
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+# Enforced by Postgres but not by every backend's field validators
+TIME_MINUTES_RANGE = \
+    BaseDatabaseOperations.integer_field_ranges['PositiveIntegerField']
+
+
+class NameCache:
+    """
+    Map (user id, name) pairs to the ids of a user's tags or ingredients,
+    creating missing names with one bulk INSERT per batch
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+        self.loaded_users = set()
+
+    def load_user(self, user_id):
+        if user_id in self.loaded_users:
+            return
+        rows = self.model.objects.filter(user_id=user_id) \
+            .order_by('-id').values_list('name', 'id')
+        # Ordered newest first so duplicate names resolve to the oldest id
+        for name, pk in rows:
+            self.ids[(user_id, name)] = pk
+        self.loaded_users.add(user_id)
+
+    def resolve(self, pairs):
+        """
+        Make sure every (user id, name) pair has an id
+        """
+        for user_id in {user_id for user_id, _ in pairs}:
+            self.load_user(user_id)
+        missing = sorted({pair for pair in pairs if pair not in self.ids})
+        if not missing:
+            return 0
+
+        objs = self.model.objects.bulk_create([
+            self.model(user_id=user_id, name=name)
+            for user_id, name in missing
+        ])
+        if all(obj.pk is not None for obj in objs):
+            for obj in objs:
+                self.ids[(obj.user_id, obj.name)] = obj.pk
+        else:
+            for user_id in {user_id for user_id, _ in missing}:
+                self.loaded_users.discard(user_id)
+                self.load_user(user_id)
+        return len(missing)
+
+
+class Command(BaseCommand):
+    """
+    Django command to bulk import recipes, with their tags and ingredients,
+    from a NDJSON or CSV file in the format written by the recipe export
+    """
+    help = 'Bulk import recipes from a NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument(
+            '--user', dest='user',
+            help='Email of the owner for rows without a "user" field')
+        parser.add_argument(
+            '--format', dest='format', choices=sorted(READERS),
+            help='Input format, guessed from the file extension by default')
+        parser.add_argument(
+            '--batch-size', dest='batch_size', type=int, default=1000,
+            help='Number of recipes written per transaction')
+        parser.add_argument(
+            '--checkpoint', dest='checkpoint',
+            help='File recording imported rows, to resume an interrupted '
+                 'import from the last committed batch')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        self.default_user = options['user']
+        self.users = {}
+        self.tags = NameCache(Tag)
+        self.ingredients = NameCache(Ingredient)
+
+        fmt = options['format'] or self.guess_format(options['path'])
+        checkpoint = options['checkpoint']
+        done = self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write('Resuming after %d rows' % done)
+
+        stream = sys.stdin if options['path'] == '-' else \
+            open(options['path'], newline='', encoding='utf-8')
+        imported, started = 0, time.monotonic()
+        try:
+            rows = islice(READERS[fmt](stream), done, None)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                self.import_batch(batch, done + imported + 1)
+                imported += len(batch)
+                self.write_checkpoint(checkpoint, done + imported)
+                self.stdout.write('Imported %d rows (%.0f rows/sec)' % (
+                    done + imported, self.rate(imported, started)))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d recipes in %.2fs (%.0f rows/sec)' % (
+                imported, time.monotonic() - started,
+                self.rate(imported, started))))
+
+    @staticmethod
+    def rate(rows, started):
+        elapsed = time.monotonic() - started
+        return rows / elapsed if elapsed > 0 else 0
+
+    @staticmethod
+    def guess_format(path):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension in ('json', 'jsonl'):
+            extension = 'ndjson'
+        if extension not in READERS:
+            raise CommandError('Cannot guess the format of %s, pass --format'
+                               % path)
+        return extension
+
+    @staticmethod
+    def read_checkpoint(path):
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path) as f:
+                return int(json.load(f)['rows'])
+        except (ValueError, KeyError, TypeError):
+            raise CommandError('Invalid checkpoint file %s' % path)
+
+    @staticmethod
+    def write_checkpoint(path, rows):
+        if not path:
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': rows}, f)
+        os.replace(tmp_path, path)
+
+    def get_user_ids(self, batch, first_row):
+        """
+        Return the owner id of every row, looking up unseen emails with one
+        query per batch
+        """
+        emails = [row.get('user') or self.default_user for row in batch]
+        for offset, email in enumerate(emails):
+            if not email:
+                raise CommandError('Row %d: no "user" field and no --user'
+                                   % (first_row + offset))
+        unseen = set(emails) - set(self.users)
+        if unseen:
+            self.users.update(get_user_model().objects.filter(
+                email__in=unseen).values_list('email', 'id'))
+            for email in unseen - set(self.users):
+                raise CommandError('Unknown user %s' % email)
+        return [self.users[email] for email in emails]
+
+    @staticmethod
+    def clean_field(model, name, value):
+        """
+        Convert and validate a value as the model field would before saving
+        it, so bad rows are reported instead of failing the bulk INSERT
+        """
+        try:
+            return model._meta.get_field(name).clean(value, None)
+        except ValidationError as exc:
+            raise ValueError('%s: %s' % (name, ' '.join(exc.messages)))
+
+    def build_recipe(self, row, user_id, row_no):
+        try:
+            title = row.get('title') or ''
+            if not isinstance(title, str) or not title.strip():
+                raise ValueError('title is required')
+            time_minutes = self.clean_field(
+                Recipe, 'time_minutes', row.get('time_minutes'))
+            if not TIME_MINUTES_RANGE[0] <= time_minutes <= \
+                    TIME_MINUTES_RANGE[1]:
+                raise ValueError('time_minutes: must be between %d and %d'
+                                 % TIME_MINUTES_RANGE)
+            link = row.get('link') or ''
+            return Recipe(
+                user_id=user_id,
+                title=title.strip()[
+                    :Recipe._meta.get_field('title').max_length],
+                time_minutes=time_minutes,
+                price=self.clean_field(
+                    Recipe, 'price', str(row.get('price'))),
+                link=self.clean_field(Recipe, 'link', link) if link else '',
+            )
+        except ValueError as exc:
+            raise CommandError('Row %d: %s' % (row_no, exc))
+
+    def row_names(self, row, field, model, row_no):
+        """
+        Return the stripped, non-blank tag or ingredient names of a row
+        """
+        names = row.get(field) or []
+        if not isinstance(names, list):
+            raise CommandError('Row %d: %s must be a list of names'
+                               % (row_no, field))
+        cleaned = []
+        for name in names:
+            if not isinstance(name, str):
+                raise CommandError('Row %d: %s must be a list of names'
+                                   % (row_no, field))
+            name = name.strip()
+            if name:
+                try:
+                    cleaned.append(self.clean_field(model, 'name', name))
+                except ValueError as exc:
+                    raise CommandError('Row %d: %s: %s'
+                                       % (row_no, field, exc))
+        return cleaned
+
+    def import_batch(self, batch, first_row):
+        """
+        Write a batch of rows in one transaction: missing tags and
+        ingredients first, then the recipes, then the link rows
+        """
+        user_ids = self.get_user_ids(batch, first_row)
+        recipes = [
+            self.build_recipe(row, user_id, first_row + offset)
+            for offset, (row, user_id) in enumerate(zip(batch, user_ids))
+        ]
+        tag_names = [
+            self.row_names(row, 'tags', Tag, first_row + offset)
+            for offset, row in enumerate(batch)
+        ]
+        ingredient_names = [
+            self.row_names(row, 'ingredients', Ingredient, first_row + offset)
+            for offset, row in enumerate(batch)
+        ]
+
+        db = Recipe.objects.db
+        with transaction.atomic(using=db):
+            for cache, names in ((self.tags, tag_names),
+                                 (self.ingredients, ingredient_names)):
+                cache.resolve([
+                    (user_id, name)
+                    for names_in_row, user_id in zip(names, user_ids)
+                    for name in names_in_row
+                ])
+
+            if connections[db].features.can_return_ids_from_bulk_insert:
+                Recipe.objects.bulk_create(recipes)
+            else:
+                for recipe in recipes:
+                    recipe.save()
+
+            tag_links, ingredient_links = [], []
+            for recipe, tags, ingredients in zip(
+                    recipes, tag_names, ingredient_names):
+                tag_ids = {self.tags.ids[(recipe.user_id, name)]
+                           for name in tags}
+                ingredient_ids = {
+                    self.ingredients.ids[(recipe.user_id, name)]
+                    for name in ingredients
+                }
+                tag_links.extend(
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                    for pk in tag_ids
+                )
+                ingredient_links.extend(
+                    Recipe.ingredients.through(
+                        recipe_id=recipe.pk, ingredient_id=pk)
+                    for pk in ingredient_ids
+                )
+            Recipe.tags.through.objects.bulk_create(tag_links)
+            Recipe.ingredients.through.objects.bulk_create(ingredient_links)
+            update_search_vectors(recipe.pk for recipe in recipes)
+
+        for user_id in set(user_ids):
+            response_cache.bump_version(user_id)
@@ -0,0 +1,149 @@
+import random
+import time
+from argparse import ArgumentTypeError
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from core.benchmark import PERF_PASSWORD, count_range, draw, perf_email
+from core.models import Tag, Ingredient, Recipe
+from recipe.search import update_search_vectors
+
+WORDS = (
+    'apple', 'basil', 'bean', 'beef', 'bread', 'butter', 'carrot', 'cheese',
+    'chicken', 'chili', 'coconut', 'curry', 'egg', 'garlic', 'ginger',
+    'lemon', 'lentil', 'mushroom', 'noodle', 'onion', 'pepper', 'potato',
+    'rice', 'salmon', 'spinach', 'tofu', 'tomato', 'vanilla',
+)
+STYLES = (
+    'baked', 'braised', 'fried', 'grilled', 'roast', 'spicy', 'steamed',
+    'stewed', 'quick', 'vegan',
+)
+
+
+def range_type(value):
+    try:
+        return count_range(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(str(exc))
+
+
+def insert(objs):
+    """
+    Insert objects with one query where the database returns the new ids,
+    otherwise one at a time
+    """
+    if not objs:
+        return objs
+    model = type(objs[0])
+    if connections[model.objects.db].features \
+            .can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save()
+    return objs
+
+
+class Command(BaseCommand):
+    """
+    Django command to generate synthetic users, tags, ingredients and
+    recipes for load testing
+    """
+    help = 'Create synthetic data for performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of users to create')
+        parser.add_argument('--tags', type=range_type, default=(10, 30),
+                            help='Tags per user, N or MIN-MAX')
+        parser.add_argument('--ingredients', type=range_type,
+                            default=(20, 80),
+                            help='Ingredients per user, N or MIN-MAX')
+        parser.add_argument('--recipes', type=range_type, default=(50, 200),
+                            help='Recipes per user, N or MIN-MAX')
+        parser.add_argument('--tags-per-recipe', dest='tags_per_recipe',
+                            type=range_type, default=(0, 3),
+                            help='Tags linked to each recipe, N or MIN-MAX')
+        parser.add_argument('--ingredients-per-recipe',
+                            dest='ingredients_per_recipe', type=range_type,
+                            default=(2, 8),
+                            help='Ingredients linked to each recipe, '
+                                 'N or MIN-MAX')
+        parser.add_argument('--prefix', default='perf',
+                            help='Prefix of the generated user emails')
+        parser.add_argument('--password', default=PERF_PASSWORD,
+                            help='Password of the generated users')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, for repeatable data sets')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        User = get_user_model()
+        prefix = options['prefix']
+        start = User.objects.filter(
+            email__startswith='%s-' % prefix).count()
+        # Hash once: every synthetic user shares the password
+        password = make_password(options['password'])
+
+        started = time.monotonic()
+        totals = {'users': 0, 'tags': 0, 'ingredients': 0, 'recipes': 0}
+        for index in range(start, start + options['users']):
+            with transaction.atomic():
+                counts = self.seed_user(
+                    rng, perf_email(prefix, index), password, options)
+            for key, value in counts.items():
+                totals[key] += value
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Created %(users)d users, %(tags)d tags, %(ingredients)d '
+            'ingredients and %(recipes)d recipes' % totals
+            + ' in %.2fs' % elapsed))
+
+    def seed_user(self, rng, email, password, options):
+        user = get_user_model().objects.create(
+            email=email, name=email.split('@')[0], password=password)
+
+        tags = insert([
+            Tag(user=user, name='%s %d' % (rng.choice(STYLES), index))
+            for index in range(draw(rng, options['tags']))
+        ])
+        ingredients = insert([
+            Ingredient(user=user, name='%s %d' % (rng.choice(WORDS), index))
+            for index in range(draw(rng, options['ingredients']))
+        ])
+        recipes = insert([
+            Recipe(
+                user=user,
+                title='%s %s with %s' % (
+                    rng.choice(STYLES).title(), rng.choice(WORDS),
+                    rng.choice(WORDS)),
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 5000)) / 100,
+            )
+            for _ in range(draw(rng, options['recipes']))
+        ])
+
+        tag_links, ingredient_links = [], []
+        for recipe in recipes:
+            count = min(draw(rng, options['tags_per_recipe']), len(tags))
+            tag_links.extend(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for tag in rng.sample(tags, count)
+            )
+            count = min(draw(rng, options['ingredients_per_recipe']),
+                        len(ingredients))
+            ingredient_links.extend(
+                Recipe.ingredients.through(
+                    recipe_id=recipe.pk, ingredient_id=ingredient.pk)
+                for ingredient in rng.sample(ingredients, count)
+            )
+        Recipe.tags.through.objects.bulk_create(tag_links)
+        Recipe.ingredients.through.objects.bulk_create(ingredient_links)
+        update_search_vectors(recipe.pk for recipe in recipes)
+
+        return {'users': 1, 'tags': len(tags),
+                'ingredients': len(ingredients), 'recipes': len(recipes)}
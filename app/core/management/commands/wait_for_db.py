@@ -1,8 +1,7 @@
-import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from core.health import NotReady, wait_until_ready
 
 
 class Command(BaseCommand):
@@ -10,16 +9,34 @@ class Command(BaseCommand):
     Django command to pause execution until database is available
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to wait for')
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait before giving up')
+        parser.add_argument('--max-delay', dest='max_delay', type=float,
+                            default=5,
+                            help='Longest pause between attempts, seconds')
+        parser.add_argument('--migrations', action='store_true',
+                            help='Also wait until migrations are applied')
+
     def handle(self, *args, **options):
-        self.stdout.write('Waiting for Docker DB service...')
-        db_conn = None
-
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stderr.write(self.style.WARNING(
-                    'Docker DB unavailable, waiting 1 seconds'))
-                time.sleep(1)
+        self.stdout.write('Waiting for database...')
+
+        def retry(exc, delay):
+            self.stderr.write(self.style.WARNING(
+                '%s, retrying in %.2f seconds' % (exc, delay)))
+
+        try:
+            wait_until_ready(
+                options['database'],
+                timeout=options['timeout'],
+                migrations=options['migrations'],
+                max_delay=options['max_delay'],
+                on_retry=retry,
+            )
+        except NotReady as exc:
+            raise CommandError('Gave up after %ss: %s'
+                               % (options['timeout'], exc))
 
         self.stdout.write(self.style.SUCCESS('Connected to DB successfully'))
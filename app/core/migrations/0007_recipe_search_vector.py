@@ -0,0 +1,53 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:40
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the GIN index and fill in vectors for existing recipes. Only
+    Postgres supports either, other databases use the search fallback
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX core_recipe_search_gin_idx '
+        'ON core_recipe USING gin (search_vector)')
+    schema_editor.execute("""
+        UPDATE core_recipe SET search_vector =
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(t.name, ' ') FROM core_tag t
+                INNER JOIN core_recipe_tags rt ON rt.tag_id = t.id
+                WHERE rt.recipe_id = core_recipe.id
+            ), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT string_agg(i.name, ' ') FROM core_ingredient i
+                INNER JOIN core_recipe_ingredients ri
+                    ON ri.ingredient_id = i.id
+                WHERE ri.recipe_id = core_recipe.id
+            ), '')), 'C')
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX core_recipe_search_gin_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
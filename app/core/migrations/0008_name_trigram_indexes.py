@@ -0,0 +1,48 @@
+# Generated by Django 2.1.15 on 2026-10-18 03:05
+
+from django.contrib.postgres.operations import (
+    BtreeGinExtension, TrigramExtension)
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    # Used by the trigram similarity (%) operator
+    ('core_tag_user_name_trgm_idx', 'core_tag', 'name'),
+    ('core_ingr_user_name_trgm_idx', 'core_ingredient', 'name'),
+    # Used by istartswith, which Django compiles to UPPER(name::text) LIKE
+    ('core_tag_user_uname_trgm_idx', 'core_tag', '(UPPER(name::text))'),
+    ('core_ingr_user_uname_trgm_idx', 'core_ingredient',
+     '(UPPER(name::text))'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Create per-user trigram indexes on names. btree_gin lets user_id share
+    the GIN index so lookups stay scoped to one user's rows
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            'CREATE INDEX %s ON %s USING gin (user_id, %s gin_trgm_ops)'
+            % (name, table, expression))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute('DROP INDEX %s' % name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from core.asgi import ThreadPoolBridge
+
+
+def http_scope(path='/api/recipe/recipes/'):
+    return {'type': 'http', 'path': path, 'method': 'GET'}
+
+
+class ThreadPoolBridgeTests(SimpleTestCase):
+
+    def call(self, bridge, scope):
+        """
+        Call the bridge and return the status it responded with
+        """
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(bridge(scope, receive, send))
+        return sent[0]['status'] if sent else None
+
+    def test_requests_reach_application(self):
+        """
+        Requests are passed to the wrapped application
+        """
+        async def application(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 201})
+
+        bridge = ThreadPoolBridge(application, threads=2, max_pending=0)
+
+        self.assertEqual(self.call(bridge, http_scope()), 201)
+        self.assertEqual(bridge.in_flight, 0)
+
+    def test_liveness_answered_on_event_loop(self):
+        """
+        Liveness probes do not reach the application
+        """
+        async def application(scope, receive, send):
+            raise AssertionError('application called')
+
+        bridge = ThreadPoolBridge(application, threads=1, max_pending=0)
+
+        self.assertEqual(self.call(bridge, http_scope('/healthz')), 200)
+
+    def test_sheds_load_when_full(self):
+        """
+        Requests beyond threads + max_pending are answered 503
+        """
+        async def application(scope, receive, send):
+            raise AssertionError('application called')
+
+        bridge = ThreadPoolBridge(application, threads=2, max_pending=1)
+        bridge.in_flight = 3
+
+        self.assertEqual(self.call(bridge, http_scope()), 503)
+        self.assertEqual(bridge.shed, 1)
+
+    def test_requests_run_on_bridge_threads(self):
+        """
+        Sync work bridged from the application runs on the sized pool
+        """
+        names = []
+
+        async def application(scope, receive, send):
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, lambda: names.append(threading.current_thread().name))
+            await send({'type': 'http.response.start', 'status': 200})
+
+        bridge = ThreadPoolBridge(application, threads=2, max_pending=0)
+        self.call(bridge, http_scope())
+
+        self.assertTrue(names[0].startswith('asgi-bridge'))
@@ -1,26 +1,324 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
-from django.db.utils import OperationalError
+from django.core.management.base import CommandError
 from django.test import TestCase
 
+from core.benchmark import count_range, percentile, perf_email
+from core.health import NotReady
+from core.models import Tag, Ingredient, Recipe
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """
         API should wait for the database to be available
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch('core.health.check_database') as check:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(check.call_count, 1)
 
-    @patch('time.sleep', return_value=True)
+    @patch('core.health.time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """
-        Test waiting for database
+        Test waiting for database, backing off between attempts
+        """
+        with patch('core.health.check_database') as check:
+            check.side_effect = [NotReady('Database unavailable')] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO(), stderr=StringIO())
+            self.assertEqual(check.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    def test_wait_for_db_timeout(self):
+        """
+        The command fails once the timeout has passed
+        """
+        with patch('core.health.check_database') as check:
+            check.side_effect = NotReady('Database unavailable')
+            with self.assertRaisesMessage(CommandError, 'Gave up'):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    def test_wait_for_db_migrations(self):
+        """
+        --migrations also waits for migrations to be applied
+        """
+        with patch('core.health.check_migrations') as check, \
+                patch('core.health._migrated', set()):
+            call_command('wait_for_db', migrations=True, stdout=StringIO())
+            self.assertEqual(check.call_count, 1)
+
+    def test_wait_for_db_real_connection(self):
+        """
+        The probe really queries the database
+        """
+        out = StringIO()
+        call_command('wait_for_db', timeout=1, stdout=out)
+        self.assertIn('Connected to DB successfully', out.getvalue())
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def write_ndjson(self, rows):
+        return self.write_file('recipes.ndjson', ''.join(
+            json.dumps(row) + '\n' for row in rows))
+
+    def test_import_ndjson(self):
+        """
+        Recipes are imported with their tags and ingredients, reusing the
+        names the user already has and de-duplicating new ones
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        path = self.write_ndjson([
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'tags': ['Vegan', 'Hot'], 'ingredients': ['Rice']},
+            {'title': 'Chili', 'time_minutes': 45, 'price': '6.00',
+             'tags': ['Hot'], 'ingredients': ['Rice', 'Beans']},
+        ])
+
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2)
+        curry = Recipe.objects.get(title='Curry')
+        self.assertIn(vegan, curry.tags.all())
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Hot', 'Vegan'])
+
+    def test_import_csv(self):
+        """
+        CSV files list tag and ingredient names separated by semicolons
+        """
+        path = self.write_file(
+            'recipes.csv',
+            'title,time_minutes,price,link,tags,ingredients\n'
+            'Toast,2,1.00,,Quick,Bread;Butter\n'
+        )
+
+        call_command('import_recipes', path, user=self.user.email,
+                     stdout=StringIO())
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Toast')
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Bread', 'Butter'])
+
+    def test_import_invalid_row(self):
+        """
+        An invalid row aborts the import and rolls back its batch
+        """
+        path = self.write_ndjson([
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50'},
+            {'title': 'Chili', 'time_minutes': 'soon', 'price': '6.00'},
+        ])
+
+        with self.assertRaisesMessage(CommandError, 'Row 2'):
+            call_command('import_recipes', path, user=self.user.email,
+                         stdout=StringIO())
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_rows_the_database_would_reject(self):
+        """
+        Values that do not fit the recipe, tag or ingredient columns are
+        reported with their row number before anything is written
+        """
+        valid = {'title': 'Curry', 'time_minutes': 30, 'price': '7.50'}
+        for invalid, message in (
+                ({'price': '1234.50'}, 'price'),
+                ({'price': '7.505'}, 'price'),
+                ({'time_minutes': -5}, 'time_minutes'),
+                ({'time_minutes': 2 ** 40}, 'time_minutes'),
+                ({'link': 'https://example.com/' + 'a' * 250}, 'link'),
+                ({'tags': [5]}, 'tags'),
+                ({'ingredients': [None]}, 'ingredients'),
+                ({'ingredients': 'Rice'}, 'ingredients'),
+                ({'tags': ['a' * 256]}, 'tags')):
+            with self.subTest(invalid=invalid):
+                path = self.write_ndjson([valid, dict(valid, **invalid)])
+
+                with self.assertRaisesMessage(CommandError,
+                                              'Row 2: %s' % message):
+                    call_command('import_recipes', path,
+                                 user=self.user.email, stdout=StringIO())
+
+                self.assertFalse(Recipe.objects.exists())
+
+    def test_import_resumes_from_checkpoint(self):
+        """
+        Rows counted in the checkpoint file are skipped, and the
+        checkpoint advances after every committed batch
+        """
+        path = self.write_ndjson([
+            {'title': 'Recipe %d' % i, 'time_minutes': 5, 'price': '1.00'}
+            for i in range(5)
+        ])
+        checkpoint = self.write_file('import.checkpoint',
+                                     json.dumps({'rows': 2}))
+        out = StringIO()
+
+        call_command('import_recipes', path, user=self.user.email,
+                     batch_size=2, checkpoint=checkpoint, stdout=out)
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'title', flat=True)),
+            ['Recipe 2', 'Recipe 3', 'Recipe 4'])
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f), {'rows': 5})
+        self.assertIn('rows/sec', out.getvalue())
+
+    def test_import_unknown_user(self):
+        """
+        Rows owned by an unknown email are rejected
+        """
+        path = self.write_ndjson([
+            {'user': 'nobody@example.com', 'title': 'Curry',
+             'time_minutes': 30, 'price': '7.50'},
+        ])
+
+        with self.assertRaisesMessage(CommandError, 'nobody@example.com'):
+            call_command('import_recipes', path, stdout=StringIO())
+
+
+class SeedPerfDataCommandTests(TestCase):
+
+    def test_seed_perf_data(self):
+        """
+        Users are created with counts drawn from the given ranges and
+        recipes linked to their own tags and ingredients
+        """
+        call_command('seed_perf_data', users=2, tags=(3, 3),
+                     ingredients=(4, 6), recipes=(5, 5),
+                     tags_per_recipe=(1, 1), ingredients_per_recipe=(2, 2),
+                     stdout=StringIO())
+
+        users = get_user_model().objects.filter(
+            email__startswith='perf-').order_by('id')
+        self.assertEqual([user.email for user in users],
+                         [perf_email('perf', 0), perf_email('perf', 1)])
+        for user in users:
+            self.assertEqual(Tag.objects.filter(user=user).count(), 3)
+            self.assertIn(
+                Ingredient.objects.filter(user=user).count(), range(4, 7))
+            recipes = Recipe.objects.filter(user=user)
+            self.assertEqual(recipes.count(), 5)
+            for recipe in recipes:
+                self.assertEqual(recipe.tags.get().user, user)
+                self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertTrue(users[0].check_password('perf-password'))
+
+    def test_seed_perf_data_continues_numbering(self):
+        """
+        Running the command again adds users rather than clashing
+        """
+        for _ in range(2):
+            call_command('seed_perf_data', users=1, recipes=(1, 1),
+                         stdout=StringIO())
+
+        self.assertTrue(get_user_model().objects.filter(
+            email=perf_email('perf', 1)).exists())
+
+    def test_count_range(self):
+        """
+        Counts are given as N or MIN-MAX
+        """
+        self.assertEqual(count_range('5'), (5, 5))
+        self.assertEqual(count_range('2-8'), (2, 8))
+        with self.assertRaises(ValueError):
+            count_range('8-2')
+
+
+class BenchmarkApiCommandTests(TestCase):
+
+    def test_percentile(self):
+        """
+        Percentiles use the nearest rank
+        """
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_benchmark_api(self):
+        """
+        The benchmark reports latency percentiles, query counts and
+        throughput for every scenario as JSON
+        """
+        call_command('seed_perf_data', users=2, recipes=(3, 3),
+                     stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark_api', iterations=4, warmup=1,
+                     scenarios=['tags_list', 'recipe_detail', 'profile'],
+                     stdout=out, stderr=StringIO())
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['users'], 2)
+        self.assertEqual(
+            set(report['scenarios']),
+            {'tags_list', 'recipe_detail', 'profile'})
+        for result in report['scenarios'].values():
+            self.assertEqual(result['requests'], 4)
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreaterEqual(result['max_queries'], 0)
+
+    def test_benchmark_api_stock_auth_explain_and_hashing(self):
+        """
+        The benchmark can use stock token authentication and add query
+        plans and password hashing rates to the report
+        """
+        call_command('seed_perf_data', users=1, recipes=(3, 3),
+                     stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark_api', iterations=2, warmup=0,
+                     scenarios=['recipes_filter_all'], auth='stock',
+                     explain=True, hashes=2, stdout=out, stderr=StringIO())
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['auth'], 'stock')
+        result = report['scenarios']['recipes_filter_all']
+        self.assertEqual(result['errors'], 0)
+        self.assertTrue(result['plans'])
+        self.assertTrue(all(plan['plan'] for plan in result['plans']))
+        self.assertEqual(report['hashing']['hashes'], 2)
+        self.assertGreater(report['hashing']['per_core_per_second'], 0)
+
+    def test_benchmark_api_requires_seeded_users(self):
+        """
+        The benchmark refuses to run without seeded users
+        """
+        with self.assertRaisesMessage(CommandError, 'seed_perf_data'):
+            call_command('benchmark_api', stdout=StringIO())
+
+    def test_benchmark_serving_requires_seeded_users(self):
+        """
+        The serving benchmark refuses to start servers without seeded users
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with self.assertRaisesMessage(CommandError, 'seed_perf_data'):
+            call_command('benchmark_serving', modes=['runserver'],
+                         stdout=StringIO())
@@ -0,0 +1,280 @@
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import pool as db_pool
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.router import ReplicaRouter, pin_user
+from core.models import Tag
+from recipe.cache import response_cache
+
+DB_STATS_URL = reverse('core:db-stats')
+CACHE_STATS_URL = reverse('core:cache-stats')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_reuses_released_connections(self):
+        """
+        Released connections are handed out again, newest first
+        """
+        pool = ConnectionPool(FakeConnection, size=2)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        self.assertIs(pool.acquire(), second)
+        self.assertEqual(pool.stats()['created'], 2)
+
+    def test_timeout_when_exhausted(self):
+        """
+        Acquiring from a fully used pool fails after the timeout
+        """
+        pool = ConnectionPool(FakeConnection, size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waits_for_release(self):
+        """
+        A waiting thread gets the connection released by another
+        """
+        pool = ConnectionPool(FakeConnection, size=1, timeout=5)
+        connection = pool.acquire()
+        threading.Timer(0.05, pool.release, [connection]).start()
+
+        self.assertIs(pool.acquire(), connection)
+
+    def test_discards_unusable_connections(self):
+        """
+        Idle connections failing the check are closed and replaced, as are
+        connections released with discard set
+        """
+        pool = ConnectionPool(FakeConnection, size=2,
+                              check=lambda conn: not conn.closed)
+        broken, dropped = pool.acquire(), pool.acquire()
+        pool.release(broken)
+        broken.closed = True
+        pool.release(dropped, discard=True)
+
+        connection = pool.acquire()
+
+        self.assertIsNot(connection, broken)
+        self.assertTrue(dropped.closed)
+        self.assertEqual(pool.stats()['discarded'], 2)
+
+    def test_stats(self):
+        """
+        Stats report connections in use against the pool size
+        """
+        pool = ConnectionPool(FakeConnection, size=4)
+        pool.acquire()
+        pool.release(pool.acquire())
+
+        stats = pool.stats()
+
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['utilization'], 0.25)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs the Postgres backend')
+class HealthCheckedConnectionTests(SimpleTestCase):
+    """
+    Health-checked connections against the real database
+    """
+
+    def make_connection(self, **settings):
+        conn = connection.copy()
+        conn.settings_dict.update(CONN_HEALTH_CHECKS=True, **settings)
+        self.addCleanup(conn.close)
+        return conn
+
+    def query(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()[0]
+
+    def test_new_connection(self):
+        """
+        A new connection opens and serves queries with checks enabled
+        """
+        conn = self.make_connection()
+
+        self.assertEqual(self.query(conn), 1)
+        self.assertTrue(conn.get_autocommit())
+
+    def test_reused_connection_checked_per_request(self):
+        """
+        A persistent connection is checked again after each request and
+        replaced when the server dropped it
+        """
+        conn = self.make_connection(CONN_MAX_AGE=None)
+        self.query(conn)
+        conn.close_if_unusable_or_obsolete()
+        first = conn.connection
+        first.close()
+
+        self.assertEqual(self.query(conn), 1)
+        self.assertIsNot(conn.connection, first)
+
+    def test_pooled_connection(self):
+        """
+        Connections taken from the pool open and serve queries
+        """
+        # Registered first so it runs after the connection is released
+        self.addCleanup(lambda: db_pool._pools.pop(connection.alias).close())
+        conn = self.make_connection(POOL={'SIZE': 1, 'TIMEOUT': 1})
+
+        self.assertEqual(self.query(conn), 1)
+        conn.close_if_unusable_or_obsolete()
+        self.assertEqual(self.query(conn), 1)
+
+
+class DatabaseStatsViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_requires_admin(self):
+        """
+        Only staff users can see database stats
+        """
+        user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reports_connections(self):
+        """
+        Stats list every database with its connection settings
+        """
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass')
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('conn_max_age', res.data['default'])
+        self.assertIn('pool', res.data['default'])
+
+    def test_reports_response_cache(self):
+        """
+        Cache stats count the response cache lookups of this process
+        """
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass')
+        self.client.force_authenticate(admin)
+        response_cache.clear()
+        self.addCleanup(response_cache.clear)
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['response_cache'],
+                         {'hits': 1, 'misses': 1})
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def record_reads(self):
+        """
+        Record the alias the router picks for each read while still running
+        the query on the test database
+        """
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            routed.append(db_for_read(router, model, **hints))
+
+        return routed, patch.object(ReplicaRouter, 'db_for_read', record)
+
+    def test_reads_outside_requests_use_primary(self):
+        """
+        Reads outside a marked request are not routed to a replica
+        """
+        self.assertIsNone(ReplicaRouter().db_for_read(Tag))
+        self.assertEqual(ReplicaRouter().db_for_write(Tag), 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        """
+        Listing tags reads from a replica
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        routed, recording = self.record_reads()
+
+        with recording:
+            self.client.get(TAGS_URL)
+
+        self.assertTrue(routed)
+        self.assertEqual(set(routed), {'replica'})
+
+    def test_write_pins_user_to_primary(self):
+        """
+        After creating a tag the user's reads go to the primary
+        """
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        routed, recording = self.record_reads()
+
+        with recording:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+        self.assertEqual(set(routed), {None})
+
+    def test_pin_is_per_user(self):
+        """
+        Pinning one user leaves other users on the replicas
+        """
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass')
+        pin_user(other.pk)
+        routed, recording = self.record_reads()
+
+        with recording:
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(set(routed), {'replica'})
+
+    def test_replicas_are_not_migrated(self):
+        """
+        Migrations only run against the primary
+        """
+        self.assertFalse(ReplicaRouter().allow_migrate('replica', 'core'))
+        self.assertIsNone(ReplicaRouter().allow_migrate('default', 'core'))
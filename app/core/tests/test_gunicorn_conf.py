@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from app import gunicorn_conf
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/recipe-app-test-cache',
+    },
+}
+SHARED_RECIPE_CACHE = {'BACKEND': 'recipe.cache.DjangoCacheBackend'}
+
+
+def server(workers):
+    return SimpleNamespace(cfg=SimpleNamespace(workers=workers))
+
+
+@patch.dict('os.environ', {'GUNICORN_ALLOW_LOCAL_CACHES': ''})
+class GunicornConfTests(SimpleTestCase):
+
+    def test_several_workers_refused_with_local_caches(self):
+        """
+        Starting several workers with per-process caches fails
+        """
+        with self.assertRaisesMessage(RuntimeError, 'RECIPE_CACHE'):
+            gunicorn_conf.on_starting(server(3))
+
+    def test_one_worker_allowed_with_local_caches(self):
+        """
+        A single worker may keep its caches in process
+        """
+        gunicorn_conf.on_starting(server(1))
+
+    @override_settings(CACHES=SHARED_CACHES,
+                       RECIPE_CACHE=SHARED_RECIPE_CACHE)
+    def test_several_workers_allowed_with_shared_caches(self):
+        """
+        Several workers start once every cache is shared
+        """
+        self.assertEqual(gunicorn_conf.per_process_caches(), [])
+        gunicorn_conf.on_starting(server(3))
+
+    @override_settings(RECIPE_CACHE=SHARED_RECIPE_CACHE)
+    def test_recipe_cache_on_local_django_cache_is_per_process(self):
+        """
+        The Django cache backend is only shared if its cache is
+        """
+        self.assertEqual(gunicorn_conf.per_process_caches(),
+                         ["CACHES['default']", 'RECIPE_CACHE'])
@@ -0,0 +1,105 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import HasherBusy, HasherPool, hasher_pool
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class HasherPoolTests(SimpleTestCase):
+    def test_runs_on_worker_thread(self):
+        """
+        Work submitted to the pool runs on one of its worker threads
+        """
+        pool = HasherPool(workers=1, queue_size=0, timeout=1)
+
+        name = pool.run(lambda: threading.current_thread().name)
+
+        self.assertTrue(name.startswith('password-hasher'))
+
+    def test_nested_calls_run_inline(self):
+        """
+        Calls made from inside a worker do not wait on the pool again
+        """
+        pool = HasherPool(workers=1, queue_size=0, timeout=0.01)
+
+        result = pool.run(lambda: pool.run(lambda: 'done'))
+
+        self.assertEqual(result, 'done')
+
+    def test_saturated_pool_raises_busy(self):
+        """
+        Callers that cannot get a slot within the timeout are rejected
+        """
+        pool = HasherPool(workers=1, queue_size=0, timeout=0.01)
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=pool.run, args=(block,))
+        thread.start()
+        started.wait()
+        try:
+            with self.assertRaises(HasherBusy):
+                pool.run(lambda: None)
+        finally:
+            release.set()
+            thread.join()
+
+
+class PasswordHasherPolicyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_pbkdf2_iterations_from_settings(self):
+        """
+        The preferred hasher uses the configured iteration count
+        """
+        with override_settings(PBKDF2_ITERATIONS=1000):
+            encoded = get_hasher().encode('testpass', 'salt')
+
+        self.assertEqual(encoded.split('$')[1], '1000')
+
+    def test_login_rehashes_outdated_password(self):
+        """
+        Logging in upgrades a password hashed with outdated parameters
+        """
+        with override_settings(PBKDF2_ITERATIONS=1000):
+            user = get_user_model().objects.create_user(
+                email='test@example.com', password='testpass')
+
+        with override_settings(PBKDF2_ITERATIONS=2000):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'test@example.com', 'password': 'testpass'})
+        user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(user.password.split('$')[1], '2000')
+
+    def test_token_busy_hasher_failure(self):
+        """
+        A saturated hashing pool turns logins away with a 503
+        """
+        get_user_model().objects.create_user(
+            email='test@example.com', password='testpass')
+
+        with patch.object(hasher_pool, 'run', side_effect=HasherBusy):
+            res = self.client.post(TOKEN_URL, {
+                'email': 'test@example.com', 'password': 'testpass'})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertNotIn('token', res.data)
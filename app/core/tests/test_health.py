@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.health import NotReady, backoff_delays, wait_until_ready
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthTests(TestCase):
+
+    def test_backoff_delays(self):
+        """
+        Delays grow exponentially up to the cap, with jitter below it
+        """
+        with patch('core.health.random.uniform',
+                   side_effect=lambda low, high: high):
+            delays = backoff_delays(0.1, 1)
+            self.assertEqual([round(next(delays), 2) for _ in range(6)],
+                             [0.1, 0.2, 0.4, 0.8, 1, 1])
+
+    def test_healthz(self):
+        """
+        The liveness probe answers without touching the database
+        """
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    @override_settings(READINESS_CHECK_MIGRATIONS=True)
+    def test_readyz(self):
+        """
+        The readiness probe checks migrations once, then only runs SELECT 1
+        """
+        with patch('core.health._migrated', set()):
+            res = self.client.get(READYZ_URL)
+            with self.assertNumQueries(1):
+                self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readyz_unavailable(self):
+        """
+        The readiness probe fails when the database does not answer
+        """
+        with patch('core.health.check_database',
+                   side_effect=NotReady('Database default unavailable')):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'unavailable')
+
+    @patch('core.health.time.sleep')
+    def test_migration_check_errors_retried(self, sleep):
+        """
+        A database error while reading the migration plan is retried
+        """
+        with patch('core.health.MigrationExecutor.migration_plan',
+                   side_effect=[OperationalError('gone away'), []]), \
+                patch('core.health._migrated', set()):
+            wait_until_ready(migrations=True)
+
+        self.assertEqual(sleep.call_count, 1)
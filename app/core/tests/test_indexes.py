@@ -0,0 +1,192 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+
+from recipe.search import suggest_names
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def explain(queryset):
+    """
+    Return the lower-cased query plan the database chooses for a queryset
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Take sequential scans off the table to see which index the
+            # planner would pick once the tables outgrow a few pages
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(str(row) for row in cursor.fetchall()).lower()
+
+
+class IndexUsageTests(TestCase):
+    """
+    The per-user list queries should be answered from indexes
+    """
+
+    def assertOrderedByIndex(self, plan):
+        """
+        Assert the plan returns rows in index order without a sort step
+        """
+        self.assertNotIn('sort key', plan)
+        self.assertNotIn('temp b-tree', plan)
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            get_user_model().objects.create_user(
+                email='user%d@example.com' % i, password='testpass')
+            for i in range(3)
+        ]
+        for user in users:
+            Tag.objects.bulk_create([
+                Tag(user=user, name='Tag %d' % i) for i in range(20)
+            ])
+            Ingredient.objects.bulk_create([
+                Ingredient(user=user, name='Ingredient %d' % i)
+                for i in range(20)
+            ])
+            for i in range(10):
+                recipe = Recipe.objects.create(
+                    user=user, title='Recipe %d' % i,
+                    time_minutes=10, price=5.00)
+                recipe.tags.set(
+                    Tag.objects.filter(user=user)[:i + 1])
+                recipe.ingredients.set(
+                    Ingredient.objects.filter(user=user)[:i + 1])
+        cls.user = users[0]
+
+        # Give the first user enough rows, and the planner statistics, that
+        # index choices match a large account rather than a tiny table
+        Tag.objects.bulk_create([
+            Tag(user=cls.user, name='Filler %05d' % i) for i in range(10000)
+        ])
+        Ingredient.objects.bulk_create([
+            Ingredient(user=cls.user, name='Filler %05d' % i)
+            for i in range(10000)
+        ])
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_tag, core_ingredient')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # ANALYZE keeps the row estimates of the rolled back filler rows,
+        # which would change the plans, and row order, of later tests
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_tag, core_ingredient')
+
+    def test_tag_list_uses_user_name_index(self):
+        """
+        Listing a user's tags by name should use the (user, name) index
+        """
+        plan = explain(
+            Tag.objects.filter(user=self.user).order_by('-name', '-id')[:101])
+
+        self.assertIn('core_tag_user_name_id_idx', plan)
+        self.assertOrderedByIndex(plan)
+
+    def test_ingredient_list_uses_user_name_index(self):
+        """
+        Listing a user's ingredients by name should use the (user, name)
+        index
+        """
+        plan = explain(Ingredient.objects.filter(
+            user=self.user).order_by('-name', '-id')[:101])
+
+        self.assertIn('core_ingr_user_name_id_idx', plan)
+        self.assertOrderedByIndex(plan)
+
+    def test_recipe_list_ordered_from_index(self):
+        """
+        Listing a user's recipes newest first should not need a sort
+        """
+        plan = explain(
+            Recipe.objects.filter(user=self.user).order_by('-id'))
+
+        self.assertOrderedByIndex(plan)
+
+    # SQLite stores the rowid in every index, so there the implicit user_id
+    # index is already id-ordered and is chosen over the added one
+    @skipUnless(connection.vendor == 'postgresql', 'Needs Postgres planner')
+    def test_recipe_list_uses_user_id_index(self):
+        """
+        Listing a user's recipes newest first should use the (user, id)
+        index rather than the implicit user_id index
+        """
+        plan = explain(
+            Recipe.objects.filter(user=self.user).order_by('-id'))
+
+        self.assertIn('core_recipe_user_id_idx', plan)
+        self.assertOrderedByIndex(plan)
+
+    def test_recipes_by_tag_use_reverse_index(self):
+        """
+        Looking up recipes from the tag side of the through table should
+        use the (tag_id, recipe_id) index
+        """
+        plan = explain(
+            Recipe.tags.through.objects.filter(
+                tag_id=Tag.objects.filter(user=self.user).first().id
+            ).values('recipe_id'))
+
+        self.assertIn('core_recipe_tags_tag_recipe_idx', plan)
+
+    def test_recipes_by_ingredient_use_reverse_index(self):
+        """
+        Looking up recipes from the ingredient side of the through table
+        should use the (ingredient_id, recipe_id) index
+        """
+        plan = explain(
+            Recipe.ingredients.through.objects.filter(
+                ingredient_id=Ingredient.objects.filter(
+                    user=self.user).first().id
+            ).values('recipe_id'))
+
+        self.assertIn('core_recipe_ingr_ingr_recipe_idx', plan)
+
+    def test_recipes_matching_all_tags_use_reverse_index(self):
+        """
+        The grouped "match all tags" filter should be answered from the
+        (tag_id, recipe_id) index
+        """
+        tag_ids = list(Tag.objects.filter(
+            user=self.user).values_list('id', flat=True)[:3])
+        plan = explain(
+            Recipe.tags.through.objects.filter(
+                tag_id__in=tag_ids
+            ).values('recipe_id').annotate(
+                matched=Count('tag_id')
+            ).filter(matched=len(tag_ids)).values('recipe_id'))
+
+        self.assertIn('core_recipe_tags_tag_recipe_idx', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs pg_trgm')
+    def test_ingredient_suggest_uses_trigram_index(self):
+        """
+        Autocomplete lookups should be answered from the trigram indexes
+        """
+        # Below a few tens of thousands of rows a user's ingredients are
+        # cheaper to filter from the user_id index, so grow the account
+        # well past that first
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_ingredient (user_id, name, updated_at) "
+                "SELECT %s, 'Bulk ' || n, now() "
+                "FROM generate_series(1, 100000) AS n", [self.user.id])
+            cursor.execute('ANALYZE core_ingredient')
+
+        plan = explain(suggest_names(
+            Ingredient.objects.filter(user=self.user), 'ingr')[:10])
+
+        self.assertIn('core_ingr_user_name_trgm_idx', plan)
+        self.assertIn('core_ingr_user_uname_trgm_idx', plan)
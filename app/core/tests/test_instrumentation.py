@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.instrumentation import QueryInstrumentationMiddleware, \
+    normalize_sql
+from core.models import Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def instrumentation(rate, threshold=3):
+    return override_settings(QUERY_INSTRUMENTATION={
+        'SAMPLE_RATE': rate, 'DUPLICATE_THRESHOLD': threshold})
+
+
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@example.com', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_normalize_sql(self):
+        """
+        Statements differing only in parameters normalize to the same shape
+        """
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            normalize_sql('SELECT  * FROM t\nWHERE id IN (%s) LIMIT 5'),
+        )
+
+    @instrumentation(1)
+    def test_sampled_request_server_timing(self):
+        """
+        Sampled requests report database, serializer and render timings
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            res = self.client.get(TAGS_URL)
+
+        timing = res['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        self.assertIn('"path": "%s"' % TAGS_URL, logs.output[0])
+
+    @instrumentation(0)
+    def test_unsampled_request(self):
+        """
+        Requests outside the sample are not instrumented
+        """
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    @instrumentation(1, threshold=3)
+    def test_duplicate_queries_flagged(self):
+        """
+        A statement repeated with different parameters is logged as a
+        warning, as an N+1 pattern would be
+        """
+        tags = [Tag.objects.create(user=self.user, name=str(i))
+                for i in range(3)]
+
+        def view(request):
+            for tag in tags:
+                Tag.objects.get(pk=tag.pk)
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(view)
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            res = middleware(RequestFactory().get('/'))
+
+        self.assertIn('"3 queries"', res['Server-Timing'])
+        self.assertIn('"count": 3', logs.output[0])
@@ -87,3 +87,20 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(recipe), recipe.title)
+
+    def test_recipe_updated_at_changes_on_save(self):
+        """
+        Recipe.updated_at should be refreshed every time a recipe is saved
+        """
+        recipe = models.Recipe.objects.create(
+            user=sample_user(),
+            title="Steak and Mushroom Sauce",
+            time_minutes=5,
+            price=5.00
+        )
+        created = recipe.updated_at
+
+        recipe.title = "Steak and Peppercorn Sauce"
+        recipe.save()
+
+        self.assertGreater(recipe.updated_at, created)
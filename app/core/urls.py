@@ -0,0 +1,12 @@
+from django.urls import path
+
+from core import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('db/', views.DatabaseStatsView.as_view(), name='db-stats'),
+    path('cache/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('throttles/', views.ThrottleStatsView.as_view(),
+         name='throttle-stats'),
+]
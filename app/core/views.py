@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from rest_framework import authentication, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.db.pool import pool_stats
+from core.health import NotReady, check_ready
+from recipe.cache import response_cache
+from user.authentication import CachedTokenAuthentication
+from user.throttling import throttle_metrics
+
+
+class StatusView(APIView):
+    """
+    Base for the staff-only views reporting per-process statistics
+    """
+    authentication_classes = (CachedTokenAuthentication,
+                              authentication.SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+
+
+class DatabaseStatsView(StatusView):
+    """
+    Report the connection settings and pool utilization of each database
+    in this worker process
+    """
+
+    def get(self, request):
+        return Response({
+            connection.alias: {
+                'vendor': connection.vendor,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'health_checks': connection.settings_dict.get(
+                    'CONN_HEALTH_CHECKS', False),
+                'pool': pool_stats(connection.alias),
+            }
+            for connection in connections.all()
+        })
+
+
+class CacheStatsView(StatusView):
+    """
+    Report the hit and miss counts of the tag and ingredient response
+    cache in this worker process
+    """
+
+    def get(self, request):
+        return Response({'response_cache': response_cache.stats()})
+
+
+class ThrottleStatsView(StatusView):
+    """
+    Report, per throttled scope, the attempts rejected in this worker
+    process and the hashing time and queries they are estimated to have
+    saved
+    """
+
+    def get(self, request):
+        return Response(throttle_metrics.stats())
+
+
+def healthz(request):
+    """
+    Liveness probe: the process is up and serving requests
+    """
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """
+    Readiness probe: the primary and any replicas answer SELECT 1, and the
+    primary is migrated when READINESS_CHECK_MIGRATIONS is set
+    """
+    try:
+        check_ready(DEFAULT_DB_ALIAS,
+                    migrations=settings.READINESS_CHECK_MIGRATIONS)
+        for alias in settings.DATABASE_REPLICAS:
+            check_ready(alias)
+    except NotReady as exc:
+        return JsonResponse({'status': 'unavailable', 'error': str(exc)},
+                            status=503)
+    return JsonResponse({'status': 'ok'})
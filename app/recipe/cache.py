@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core.cache import LRUCache
+
+
+def _now_stamp():
+    return int(time.time() * 1000)
+
+
+class LocMemBackend:
+    """
+    Per-process LRU storage for cached responses and per-user versions.
+    Versions are not shared between processes, so multi-process servers
+    should use the Django cache backend instead
+    """
+
+    def __init__(self, MAX_ENTRIES=1000, MAX_VERSIONS=10000):
+        self.entries = LRUCache(max_entries=MAX_ENTRIES)
+        self.versions = LRUCache(max_entries=MAX_VERSIONS)
+
+    def get_version(self, user_id):
+        return self.versions.get(user_id)
+
+    def set_version(self, user_id, version):
+        self.versions.set(user_id, version)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries.set(key, value)
+
+    def clear(self):
+        self.entries.clear()
+        self.versions.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Storage backed by one of the caches configured in settings.CACHES, so
+    versions are shared by every process using that cache
+    """
+
+    def __init__(self, CACHE_ALIAS='default', TIMEOUT=300):
+        self.cache = caches[CACHE_ALIAS]
+        self.timeout = TIMEOUT
+
+    def get_version(self, user_id):
+        return self.cache.get('recipe:version:%s' % user_id)
+
+    def set_version(self, user_id, version):
+        self.cache.set('recipe:version:%s' % user_id, version, None)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResponseCache:
+    """
+    Caches serialized list responses per user and resource. Every entry is
+    keyed by the user's current version, so bumping the version on a write
+    makes all of that user's cached responses unreachable at once
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_version(self, user_id):
+        """
+        Return the user's current version, a millisecond timestamp of the
+        last write this process has seen
+        """
+        version = self.backend.get_version(user_id)
+        if version is None:
+            # Unknown (or evicted) users start at the current time, which
+            # can never match a key written before the eviction
+            version = _now_stamp()
+            self.backend.set_version(user_id, version)
+        return version
+
+    def bump_version(self, user_id):
+        """
+        Invalidate every cached response for the user. The bump is repeated
+        once the surrounding transaction commits so a concurrent read of the
+        pre-commit rows cannot be cached under the new version
+        """
+        def bump():
+            current = self.backend.get_version(user_id) or 0
+            self.backend.set_version(
+                user_id, max(current + 1, _now_stamp()))
+
+        bump()
+        transaction.on_commit(bump)
+
+    def make_key(self, user_id, resource, query_string=''):
+        digest = hashlib.md5(query_string.encode('utf-8')).hexdigest()
+        return 'recipe:%s:%s:%s:%s' % (
+            resource, user_id, self.get_version(user_id), digest)
+
+    def get(self, user_id, resource, query_string=''):
+        return self.get_entry(self.make_key(user_id, resource, query_string))
+
+    def set(self, user_id, resource, query_string, value):
+        self.set_entry(self.make_key(user_id, resource, query_string), value)
+
+    def get_entry(self, key):
+        """
+        Look up a key from make_key. Callers that store what they read
+        should keep the key, so the value is stored under the version it
+        was read at even if a write bumps the version in between
+        """
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set_entry(self, key, value):
+        self.backend.set(key, value)
+
+    def stats(self):
+        """
+        Return the hit/miss counters for this process
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def _build_cache():
+    config = getattr(settings, 'RECIPE_CACHE', {})
+    backend_class = import_string(
+        config.get('BACKEND', 'recipe.cache.LocMemBackend'))
+    return ResponseCache(backend_class(**config.get('OPTIONS', {})))
+
+
+response_cache = _build_cache()
@@ -0,0 +1,90 @@
+import csv
+import json
+from itertools import islice
+
+from core.models import Recipe
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link',
+                 'updated_at', 'tags', 'ingredients')
+NAME_SEPARATOR = ';'
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _names_by_recipe(field, recipe_ids):
+    """
+    Map recipe ids to the names linked through a M2M field, in one query
+    """
+    m2m = Recipe._meta.get_field(field)
+    name = '%s__name' % m2m.m2m_reverse_field_name()
+    rows = m2m.remote_field.through.objects.filter(
+        recipe_id__in=recipe_ids).values_list('recipe_id', name)
+    names = {}
+    for recipe_id, value in rows.order_by(name):
+        names.setdefault(recipe_id, []).append(value)
+    return names
+
+
+def iter_recipes(queryset, chunk_size):
+    """
+    Yield export rows for every recipe in the queryset, streaming recipes
+    from a server-side cursor and fetching tag and ingredient names with
+    one query per chunk, so memory use does not grow with the book size
+    """
+    recipes = queryset.order_by('id').values_list(
+        'id', 'title', 'time_minutes', 'price', 'link', 'updated_at'
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _chunks(recipes, chunk_size):
+        ids = [row[0] for row in chunk]
+        tags = _names_by_recipe('tags', ids)
+        ingredients = _names_by_recipe('ingredients', ids)
+        for row in chunk:
+            yield row + (tags.get(row[0], []), ingredients.get(row[0], []))
+
+
+def iter_ndjson(rows):
+    """
+    Render rows as newline-delimited JSON objects
+    """
+    for (pk, title, time_minutes, price, link, updated_at,
+         tags, ingredients) in rows:
+        yield json.dumps({
+            'id': pk,
+            'title': title,
+            'time_minutes': time_minutes,
+            'price': str(price),
+            'link': link,
+            'updated_at': updated_at.isoformat(),
+            'tags': tags,
+            'ingredients': ingredients,
+        }) + '\n'
+
+
+class _Echo:
+    """
+    A file-like object whose write returns the value, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Render rows as CSV with a header, joining tag and ingredient names
+    with semicolons
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            row[:5] + (row[5].isoformat(), NAME_SEPARATOR.join(row[6]),
+                       NAME_SEPARATOR.join(row[7])))
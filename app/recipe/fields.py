@@ -0,0 +1,88 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS, ManyRelatedField, PrimaryKeyRelatedField)
+
+
+class UserOwnedManyRelatedField(ManyRelatedField):
+    """
+    Validates a list of primary keys with a single query and reports every
+    id that does not exist (or belongs to someone else) in one error
+    """
+    default_error_messages = {
+        'does_not_exist': _(
+            'Invalid pks "{pk_values}" - objects do not exist.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = [self.child_relation.to_pk(item) for item in data]
+        resolved = self.child_relation.get_resolved_objects()
+        if resolved is None:
+            resolved = self.child_relation.get_queryset().in_bulk(set(pks))
+
+        missing = [pk for pk in dict.fromkeys(pks) if pk not in resolved]
+        if missing:
+            self.fail('does_not_exist',
+                      pk_values=', '.join(str(pk) for pk in missing))
+        return [resolved[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    A primary key field limited to objects owned by the requesting user.
+
+    With many=True the submitted ids are fetched in one query. Views that
+    resolve objects for a whole batch up front can pass them in the
+    serializer context under 'related_objects' (a mapping of model to
+    {pk: object}) so no query is made at all
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserOwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+    def get_resolved_objects(self):
+        """
+        Return the {pk: object} mapping the view resolved for this model,
+        or None if the view did not resolve any
+        """
+        return self.context.get('related_objects', {}).get(
+            self.get_queryset().model)
+
+    def to_pk(self, data):
+        """
+        Convert submitted data to a primary key without querying
+        """
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_internal_value(self, data):
+        pk = self.to_pk(data)
+        resolved = self.get_resolved_objects()
+        if resolved is None:
+            return super().to_internal_value(pk)
+        try:
+            return resolved[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
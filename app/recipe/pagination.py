@@ -0,0 +1,42 @@
+from rest_framework.pagination import CursorPagination, \
+    LimitOffsetPagination
+
+
+class RecipeAttrCursorPagination(CursorPagination):
+    """
+    Keyset pagination for Tag and Ingredient lists, ordered by name with the
+    primary key as a tie-breaker so pages stay stable between requests.
+
+    DRF seeks on the first ordering field only. While names are distinct,
+    each page is a seek past the last name, from the (user, name, id)
+    index. When a page ends inside a run of equal names, the cursor keeps
+    the last distinct name and an offset into the run. That offset is
+    bounded by the number of objects sharing one name, not by the depth
+    of the page, and is capped at offset_cutoff
+    """
+    ordering = ('-name', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Keyset pagination for Recipe lists, newest recipes first
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class RecipeSearchPagination(LimitOffsetPagination):
+    """
+    Offset pagination for recipe searches, which are ordered by rank. A
+    cursor would seek on the rank alone and loop once more matches than
+    offset_cutoff share a rank; and with no index on the rank every page
+    ranks and sorts all matches anyway, so an offset costs little extra
+    """
+    default_limit = 50
+    limit_query_param = 'page_size'
+    max_limit = 500
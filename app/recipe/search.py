@@ -0,0 +1,110 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity)
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, \
+    When
+
+from core.models import Recipe
+
+SEARCH_CONFIG = 'english'
+
+# Title matches rank above tag matches, which rank above ingredient matches.
+# The tag and ingredient names of the batch are aggregated once, grouped by
+# recipe, rather than in a subquery run for every recipe
+UPDATE_SEARCH_VECTOR_SQL = """
+UPDATE core_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, core_recipe.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig,
+                          coalesce(tags.names, '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig,
+                          coalesce(ingredients.names, '')), 'C')
+FROM unnest(%(ids)s::integer[]) AS batch(id)
+LEFT JOIN (
+    SELECT rt.recipe_id, string_agg(t.name, ' ') AS names
+    FROM core_recipe_tags rt
+    INNER JOIN core_tag t ON t.id = rt.tag_id
+    WHERE rt.recipe_id = ANY(%(ids)s)
+    GROUP BY rt.recipe_id
+) tags ON tags.recipe_id = batch.id
+LEFT JOIN (
+    SELECT ri.recipe_id, string_agg(i.name, ' ') AS names
+    FROM core_recipe_ingredients ri
+    INNER JOIN core_ingredient i ON i.id = ri.ingredient_id
+    WHERE ri.recipe_id = ANY(%(ids)s)
+    GROUP BY ri.recipe_id
+) ingredients ON ingredients.recipe_id = batch.id
+WHERE core_recipe.id = batch.id
+"""
+
+# Recipes updated per statement
+UPDATE_SEARCH_VECTOR_BATCH = 1000
+
+
+def search_enabled():
+    """
+    Full-text search needs Postgres; other databases use the fallback
+    """
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(recipe_ids):
+    """
+    Recompute the stored search vector of the given recipes, with one
+    UPDATE per UPDATE_SEARCH_VECTOR_BATCH recipes
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), UPDATE_SEARCH_VECTOR_BATCH):
+            cursor.execute(UPDATE_SEARCH_VECTOR_SQL, {
+                'config': SEARCH_CONFIG,
+                'ids': recipe_ids[start:start + UPDATE_SEARCH_VECTOR_BATCH],
+            })
+
+
+def search_recipes(queryset, terms):
+    """
+    Filter recipes to those matching the search terms. On Postgres this
+    uses the GIN-indexed search vector and annotates a rank; elsewhere it
+    falls back to substring matches on the title, tag and ingredient names
+    """
+    if search_enabled():
+        query = SearchQuery(terms, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query))
+
+    return queryset.filter(
+        Q(title__icontains=terms) |
+        Q(pk__in=Recipe.tags.through.objects.filter(
+            tag__name__icontains=terms).values('recipe_id')) |
+        Q(pk__in=Recipe.ingredients.through.objects.filter(
+            ingredient__name__icontains=terms).values('recipe_id'))
+    )
+
+
+def suggest_names(queryset, terms):
+    """
+    Return the objects whose name starts with or closely resembles the
+    terms: prefix matches first, by name, then close matches, most similar
+    first. On Postgres both conditions are answered by the pg_trgm GIN
+    indexes on name; elsewhere only prefixes match
+    """
+    if not search_enabled():
+        return queryset.filter(name__istartswith=terms).order_by('name')
+
+    return queryset.filter(
+        Q(name__istartswith=terms) | Q(name__trigram_similar=terms)
+    ).annotate(
+        prefix=Case(
+            When(name__istartswith=terms, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        # Prefix matches all score the same, so they stay in name order
+        similarity=Case(
+            When(prefix=1, then=Value(0.0)),
+            default=TrigramSimilarity('name', terms),
+            output_field=FloatField(),
+        ),
+    ).order_by('-prefix', '-similarity', 'name')
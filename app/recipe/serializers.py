@@ -1,38 +1,58 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from core.instrumentation import TimedSerializerMixin
 from core.models import Tag, Ingredient, Recipe
+from .fields import UserOwnedPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Tag model objects in the core app
     """
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Ingredient model objects in the core app
     """
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+def parse_field_list(request, name):
+    """
+    Return the set of names in a comma separated query parameter
     """
-    Serializer for Recipe model objects in the core app
+    value = request.query_params.get(name, '')
+    return {field.strip() for field in value.split(',') if field.strip()}
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
-    ingredients = serializers.PrimaryKeyRelatedField(
+    Serializer for Recipe model objects in the core app.
+
+    On reads, ?fields=id,title limits the output to the listed fields and
+    ?expand=ingredients,tags replaces id lists with nested objects
+    """
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -40,5 +60,29 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes',
-                  'price', 'link')
-        read_only_fields = ('id',)
+                  'price', 'link', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        fields = parse_field_list(request, 'fields')
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+        for name in parse_field_list(request, 'expand'):
+            if name in self.fields and name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True, read_only=True)
+
+
+class RecipeDetailSerializer(RecipeSerializer):
+    """
+    Serializer for a single Recipe, nesting its ingredients and tags
+    """
+    ingredients = IngredientSerializer(many=True, read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
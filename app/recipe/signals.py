@@ -0,0 +1,87 @@
+from django.db.models.signals import (
+    post_save, pre_delete, post_delete, m2m_changed)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from .cache import response_cache
+from .search import update_search_vectors
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Invalidate the owner's cached responses whenever one of their objects
+    is saved or deleted
+    """
+    response_cache.bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_cache_m2m(sender, instance, action, **kwargs):
+    """
+    Invalidate the owner's cached responses when a recipe's tags or
+    ingredients change
+    """
+    if action.startswith('post_'):
+        response_cache.bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """
+    Refresh a recipe's search vector when its title may have changed
+    """
+    update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_search_vectors(sender, instance, action, reverse,
+                                 pk_set, **kwargs):
+    """
+    Refresh search vectors when tags or ingredients are linked to or
+    unlinked from recipes, from either side of the relation
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        update_search_vectors([instance.pk])
+    elif pk_set:
+        update_search_vectors(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_named_search_vectors(sender, instance, created, **kwargs):
+    """
+    Refresh the search vectors of recipes using a renamed tag or ingredient
+    """
+    if not created:
+        update_search_vectors(
+            instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_linked_recipes(sender, instance, **kwargs):
+    """
+    Note which recipes a tag or ingredient belongs to before the cascade
+    removes the links
+    """
+    instance._linked_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_unlinked_search_vectors(sender, instance, **kwargs):
+    """
+    Drop a deleted tag or ingredient's name from its recipes' vectors
+    """
+    update_search_vectors(getattr(instance, '_linked_recipe_ids', []))
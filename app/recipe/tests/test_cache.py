@@ -0,0 +1,77 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from recipe.cache import ResponseCache, LocMemBackend, DjangoCacheBackend
+
+
+class ResponseCacheTests(SimpleTestCase):
+    """
+    Test the response cache against each storage backend
+    """
+
+    def backends(self):
+        return [LocMemBackend(), DjangoCacheBackend()]
+
+    def test_get_set(self):
+        """
+        Stored responses are returned for the same user and query
+        """
+        for backend in self.backends():
+            cache = ResponseCache(backend)
+            cache.clear()
+            cache.set(1, 'tag', '?page_size=2', {'results': []})
+
+            self.assertEqual(cache.get(1, 'tag', '?page_size=2'),
+                             {'results': []})
+            self.assertIsNone(cache.get(1, 'tag', ''))
+            self.assertIsNone(cache.get(2, 'tag', '?page_size=2'))
+            self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2})
+
+    def test_bump_version_invalidates(self):
+        """
+        Bumping a user's version hides every response cached before it
+        """
+        for backend in self.backends():
+            cache = ResponseCache(backend)
+            cache.clear()
+            cache.set(1, 'tag', '', {'results': []})
+            cache.set(2, 'tag', '', {'results': []})
+            version = cache.get_version(1)
+
+            cache.bump_version(1)
+
+            self.assertGreater(cache.get_version(1), version)
+            self.assertIsNone(cache.get(1, 'tag', ''))
+            self.assertIsNotNone(cache.get(2, 'tag', ''))
+
+    def test_locmem_backend_bounded(self):
+        """
+        The local-memory backend evicts old responses once full
+        """
+        cache = ResponseCache(LocMemBackend(MAX_ENTRIES=2))
+        for i in range(3):
+            cache.set(1, 'tag', str(i), {'page': i})
+
+        self.assertIsNone(cache.get(1, 'tag', '0'))
+        self.assertEqual(cache.get(1, 'tag', '2'), {'page': 2})
+
+    def test_counts_concurrent_lookups(self):
+        """
+        Hits and misses from several threads are all counted
+        """
+        cache = ResponseCache(LocMemBackend())
+        cache.set(1, 'tag', '', {'results': []})
+
+        def lookup():
+            for _ in range(1000):
+                cache.get(1, 'tag', '')
+                cache.get(1, 'tag', 'missing')
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(cache.stats(), {'hits': 8000, 'misses': 8000})
@@ -1,15 +1,22 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
+from recipe.pagination import RecipeAttrCursorPagination
+from recipe.cache import response_cache
 from recipe.serializers import IngredientSerializer
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+SUGGEST_URL = reverse('recipe:ingredient-suggest')
 
 
 class PublicIngredientsApiTests(TestCase):
@@ -48,6 +55,7 @@ class PrivateIngredientsApiTests(TestCase):
         )
         self.client = APIClient()
         self.client.force_authenticate(self.user)
+        response_cache.clear()
 
         # Create Known Good (KG) and Known Bad (KB) payloads
         self.payload_KG = {
@@ -75,12 +83,12 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         # Get serialized data from database for comparison
-        ingredients = Ingredient.objects.all().order_by('-name')
+        ingredients = Ingredient.objects.all().order_by('-name', '-id')
         serializer = IngredientSerializer(ingredients, many=True)
 
         # Assert that request is successful and data matches
         self.assertTrue(status.is_success(res.status_code))
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_ingredients_limited_to_user_success(self):
         """
@@ -98,8 +106,38 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertTrue(status.is_success(res.status_code))
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], my_ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], my_ingredient.name)
+
+    def test_get_ingredients_page_size_capped(self):
+        """
+        Clients cannot request pages larger than the configured maximum
+        """
+        Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name='Ingredient %d' % i)
+            for i in range(3)
+        ])
+
+        with patch.object(RecipeAttrCursorPagination, 'max_page_size', 2):
+            res = self.client.get(INGREDIENTS_URL, {'page_size': 100})
+
+        self.assertTrue(status.is_success(res.status_code))
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_recipe_change_invalidates_ingredient_cache(self):
+        """
+        Linking an ingredient to a recipe invalidates the cached list
+        """
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Fries', time_minutes=20, price=3.00)
+        self.client.get(INGREDIENTS_URL)
+
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
 
     def test_ingredient_create_success(self):
         """
@@ -121,3 +159,96 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.post(INGREDIENTS_URL, self.payload_KB_name)
 
         self.assertTrue(status.is_client_error(res.status_code))
+
+    def test_bulk_create_ingredients_success(self):
+        """
+        Users can import many ingredients with a single request
+        """
+        payload = [{'name': 'Ingredient %d' % i} for i in range(20)]
+
+        res = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 20)
+
+    def test_bulk_create_ingredients_partial_all_invalid_failure(self):
+        """
+        A partial batch with no valid ingredients is a client error
+        """
+        res = self.client.post(INGREDIENTS_URL + '?allow_partial=true',
+                               [self.payload_KB_name], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['created'], [])
+        self.assertEqual(len(res.data['errors']), 1)
+
+    def test_get_ingredients_assigned_only(self):
+        """
+        assigned_only limits the list to ingredients used by a recipe
+        """
+        used = Ingredient.objects.create(user=self.user, name='Eggs')
+        Ingredient.objects.create(user=self.user, name='Flour')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Omelette', time_minutes=5, price=2.00)
+        recipe.ingredients.add(used)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 'true'})
+
+        self.assertEqual([ing['id'] for ing in res.data['results']],
+                         [used.id])
+
+    def test_suggest_ingredients_by_prefix(self):
+        """
+        Suggestions return the user's ingredients starting with the query,
+        in name order
+        """
+        Ingredient.objects.create(user=self.user, name='Garlic')
+        Ingredient.objects.create(user=self.user, name='Garam masala')
+        Ingredient.objects.create(user=self.user, name='Ginger')
+        Ingredient.objects.create(user=self.private_user, name='Garlic salt')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'gar'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Garam masala', 'Garlic'])
+        self.assertEqual(set(res.data[0]), {'id', 'name'})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs pg_trgm')
+    def test_suggest_ingredients_close_matches_after_prefixes(self):
+        """
+        Close but not prefix matches follow the prefix matches
+        """
+        for name in ('Wild garlic', 'Garlic salt', 'Garlic', 'Ginger'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(SUGGEST_URL, {'q': 'garl'})
+
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Garlic', 'Garlic salt', 'Wild garlic'])
+
+    def test_suggest_ingredients_limited(self):
+        """
+        Suggestions are capped by limit and by the hard maximum
+        """
+        Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name='Pepper %d' % i)
+            for i in range(30)
+        ])
+
+        limited = self.client.get(SUGGEST_URL, {'q': 'pep', 'limit': 3})
+        capped = self.client.get(SUGGEST_URL, {'q': 'pep', 'limit': 1000})
+
+        self.assertEqual(len(limited.data), 3)
+        self.assertEqual(len(capped.data), 25)
+
+    def test_suggest_ingredients_empty_query(self):
+        """
+        An empty query returns no suggestions without touching the database
+        """
+        with self.assertNumQueries(0):
+            res = self.client.get(SUGGEST_URL, {'q': ' '})
+
+        self.assertEqual(res.data, [])
@@ -1,16 +1,27 @@
+import csv
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe
+from core.models import Recipe, Tag, Ingredient
 
-from recipe.serializers import RecipeSerializer
+from recipe.cache import response_cache
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewSet
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def sample_recipe(user, **params):
@@ -26,6 +37,13 @@ def sample_recipe(user, **params):
     return Recipe.objects.create(user=user, **defaults)
 
 
+def detail_url(recipe_id):
+    """
+    Return the detail URL for a given Recipe
+    """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
 class PublicRecipeAPITests(TestCase):
     """
     Test unauthenticated requests made to the Recipe resource
@@ -61,6 +79,7 @@ class PrivateRecipeAPITests(TestCase):
             password="mypasswordkeepsalltheboysfrommyyard"
         )
         self.client.force_authenticate(self.user)
+        response_cache.clear()
         self.payload_KG = sample_recipe(self.user)
 
     def test_get_recipes_success(self):
@@ -74,7 +93,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertTrue(status.is_success(res.status_code))
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipes_limited_to_user_success(self):
         """
@@ -87,5 +106,589 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertTrue(status.is_success(res.status_code))
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_get_recipes_paginated_by_cursor(self):
+        """
+        Recipes are returned newest first in cursor-linked pages
+        """
+        recipes = [self.payload_KG] + [
+            sample_recipe(user=self.user, title='Recipe %d' % i)
+            for i in range(4)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_list_recipes_query_count_constant(self):
+        """
+        Listing recipes should not issue extra queries per recipe
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+
+        def query_count():
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(RECIPE_URL)
+            self.assertTrue(status.is_success(res.status_code))
+            return len(ctx.captured_queries)
+
+        self.payload_KG.tags.add(tag)
+        self.payload_KG.ingredients.add(ingredient)
+        baseline = query_count()
+
+        for i in range(10):
+            recipe = sample_recipe(user=self.user, title='Recipe %d' % i)
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        self.assertEqual(query_count(), baseline)
+
+    def test_retrieve_recipe_detail_nested(self):
+        """
+        Retrieving a recipe nests its ingredients and tags, loaded with the
+        recipe and one prefetch each
+        """
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(3)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name='Ing %d' % i)
+            for i in range(5)
+        ]
+        self.payload_KG.tags.add(*tags)
+        self.payload_KG.ingredients.add(*ingredients)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(self.payload_KG.id))
+        serializer = RecipeDetailSerializer(self.payload_KG)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['tags'][0]['name'], 'Tag 0')
+
+    def test_list_recipes_not_modified(self):
+        """
+        A client presenting the current ETag gets a 304 without queries
+        """
+        res = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_recipes_modified_after_write(self):
+        """
+        Changing a recipe invalidates previously issued ETags
+        """
+        res = self.client.get(RECIPE_URL)
+        self.payload_KG.title = 'Updated recipe'
+        self.payload_KG.save()
+
+        fresh = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(fresh['ETag'], res['ETag'])
+        self.assertEqual(fresh.data['results'][0]['title'], 'Updated recipe')
+
+    def test_list_recipes_modified_in_same_second(self):
+        """
+        A write in the same second as a read is never answered with a 304
+        """
+        self.client.get(RECIPE_URL)
+        self.payload_KG.title = 'Updated recipe'
+        self.payload_KG.save()
+
+        fresh = self.client.get(RECIPE_URL, HTTP_IF_MODIFIED_SINCE=http_date())
+
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', fresh)
+        self.assertEqual(fresh.data['results'][0]['title'], 'Updated recipe')
+
+    def test_retrieve_recipe_not_modified(self):
+        """
+        Retrieving a recipe supports If-None-Match
+        """
+        url = detail_url(self.payload_KG.id)
+        res = self.client.get(url)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_scoped_to_user(self):
+        """
+        One user's ETag is never a match for another user's list
+        """
+        res = self.client.get(RECIPE_URL)
+
+        self.client.force_authenticate(self.private_user)
+        other = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_bulk_create_recipes_success(self):
+        """
+        Users can create many recipes with their links in one request
+        """
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(3)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name='Ing %d' % i)
+            for i in range(3)
+        ]
+        payload = [
+            {
+                'title': 'Recipe %d' % i,
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id for tag in tags[:i + 1]],
+                'ingredients': [ing.id for ing in ingredients[:i + 1]],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for item in payload:
+            recipe = Recipe.objects.get(user=self.user, title=item['title'])
+            self.assertEqual(
+                sorted(recipe.tags.values_list('id', flat=True)),
+                item['tags'])
+            self.assertEqual(
+                sorted(recipe.ingredients.values_list('id', flat=True)),
+                item['ingredients'])
+
+    def test_bulk_create_recipes_lookups_batched(self):
+        """
+        Referencing more tags and ingredients does not add queries
+        """
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(10)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name='Ing %d' % i)
+            for i in range(10)
+        ]
+
+        def query_count(related_count):
+            payload = [
+                {
+                    'title': 'Recipe %d' % i,
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    'tags': [tag.id for tag in tags[:related_count]],
+                    'ingredients': [
+                        ing.id for ing in ingredients[:related_count]],
+                }
+                for i in range(5)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(query_count(1), query_count(10))
+
+    def test_bulk_create_recipes_other_users_objects_failure(self):
+        """
+        Bulk-created recipes cannot reference another user's tags
+        """
+        tag = Tag.objects.create(user=self.private_user, name='Private')
+        payload = [{
+            'title': 'Sneaky recipe',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag.id],
+            'ingredients': [],
+        }]
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data[0])
+        self.assertFalse(
+            Recipe.objects.filter(title='Sneaky recipe').exists())
+
+    def test_create_recipe_with_tags_and_ingredients_success(self):
+        """
+        Creating a recipe validates all related ids with one query per field
+        """
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(5)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name='Ing %d' % i)
+            for i in range(50)
+        ]
+        payload = {
+            'title': 'Big salad',
+            'time_minutes': 15,
+            'price': '12.00',
+            'tags': [tag.id for tag in tags],
+            'ingredients': [ing.id for ing in ingredients],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+        lookups = [
+            query for query in ctx.captured_queries
+            if query['sql'].startswith('SELECT') and (
+                'FROM "core_tag"' in query['sql'] or
+                'FROM "core_ingredient"' in query['sql']) and
+            'INNER JOIN' not in query['sql']
+        ]
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(lookups), 2)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 50)
+        self.assertEqual(recipe.tags.count(), 5)
+
+    def test_create_recipe_other_users_objects_failure(self):
+        """
+        A recipe cannot reference another user's tags or ingredients, and
+        every missing id is reported at once
+        """
+        tag = Tag.objects.create(user=self.private_user, name='Private')
+        ingredient = Ingredient.objects.create(
+            user=self.private_user, name='Secret sauce')
+        own = Ingredient.objects.create(user=self.user, name='Rice')
+        payload = {
+            'title': 'Sneaky recipe',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag.id],
+            'ingredients': [own.id, ingredient.id, 99999],
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(tag.id), res.data['tags'][0])
+        self.assertIn('%d, 99999' % ingredient.id, res.data['ingredients'][0])
+        self.assertNotIn(str(own.id) + ',', res.data['ingredients'][0])
+        self.assertFalse(
+            Recipe.objects.filter(title='Sneaky recipe').exists())
+
+    def test_create_recipe_invalid_related_id_failure(self):
+        """
+        Non-integer related ids are rejected as the wrong type
+        """
+        payload = {
+            'title': 'Bad ids',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': ['abc'],
+            'ingredients': [],
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['tags'][0].code, 'incorrect_type')
+
+    def test_filter_recipes_by_tags_any(self):
+        """
+        Recipes can be filtered to those having any of the given tags
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        recipe1 = sample_recipe(user=self.user, title='Tofu stir fry')
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        recipe1.tags.add(vegan)
+        recipe2.tags.add(quick)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': '%d,%d' % (vegan.id, quick.id)})
+
+        ids = {recipe['id'] for recipe in res.data['results']}
+        self.assertEqual(ids, {recipe1.id, recipe2.id})
+
+    def test_filter_recipes_by_tags_all(self):
+        """
+        With match=all only recipes having every given tag are returned
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        recipe1 = sample_recipe(user=self.user, title='Tofu stir fry')
+        recipe2 = sample_recipe(user=self.user, title='Bean stew')
+        recipe1.tags.add(vegan, quick)
+        recipe2.tags.add(vegan)
+
+        res = self.client.get(RECIPE_URL, {
+            'tags': '%d,%d' % (vegan.id, quick.id),
+            'match': 'all',
+        })
+
+        self.assertEqual([recipe['id'] for recipe in res.data['results']],
+                         [recipe1.id])
+
+    def test_filter_recipes_all_is_single_grouped_query(self):
+        """
+        Matching all of many tags runs one grouped subquery, not a join per
+        tag
+        """
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(8)]
+        self.payload_KG.tags.add(*tags)
+        params = {
+            'tags': ','.join(str(tag.id) for tag in tags),
+            'match': 'all',
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, params)
+        sql = ctx.captured_queries[0]['sql']
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIn('HAVING', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """
+        Tag and ingredient filters can be combined
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe1 = sample_recipe(user=self.user, title='Tofu stir fry')
+        recipe2 = sample_recipe(user=self.user, title='Bean stew')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(tofu)
+        recipe2.tags.add(tag)
+
+        res = self.client.get(
+            RECIPE_URL, {'tags': str(tag.id), 'ingredients': str(tofu.id)})
+
+        self.assertEqual([recipe['id'] for recipe in res.data['results']],
+                         [recipe1.id])
+
+    def test_filter_recipes_invalid_ids_failure(self):
+        """
+        Non-numeric filter ids are rejected
+        """
+        res = self.client.get(RECIPE_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """
+        Recipes can be searched by title, tag name and ingredient name
+        """
+        by_title = sample_recipe(user=self.user, title='Lemon tart')
+        by_tag = sample_recipe(user=self.user, title='Sorbet')
+        by_tag.tags.add(Tag.objects.create(user=self.user, name='Lemon'))
+        by_ingredient = sample_recipe(user=self.user, title='Fish')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Lemons'))
+        sample_recipe(user=self.user, title='Steak')
+        sample_recipe(user=self.private_user, title='Lemon cake')
+
+        res = self.client.get(RECIPE_URL, {'search': 'lemon'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {recipe['id'] for recipe in res.data['results']},
+            {by_title.id, by_tag.id, by_ingredient.id})
+
+    def test_search_reflects_renamed_tag(self):
+        """
+        Renaming a tag updates which recipes match a search
+        """
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        self.payload_KG.tags.add(tag)
+
+        tag.name = 'Mild'
+        tag.save()
+        res = self.client.get(RECIPE_URL, {'search': 'mild'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data['results']],
+                         [self.payload_KG.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs Postgres search')
+    def test_search_recipes_ranked(self):
+        """
+        On Postgres title matches rank above ingredient matches
+        """
+        by_title = sample_recipe(user=self.user, title='Garlic bread')
+        by_ingredient = sample_recipe(user=self.user, title='Pasta')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Garlic'))
+
+        res = self.client.get(RECIPE_URL, {'search': 'garlic'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data['results']],
+                         [by_title.id, by_ingredient.id])
+
+    def test_search_recipes_pages_complete(self):
+        """
+        Walking search results page by page returns every match once,
+        including matches with tied ranks
+        """
+        titles = ['Garlic bread', 'Garlic soup', 'Garlic garlic prawns',
+                  'Roast garlic', 'Garlic butter garlic']
+        matches = {sample_recipe(user=self.user, title=title).id
+                   for title in titles * 3}
+
+        res = self.client.get(RECIPE_URL, {'search': 'garlic', 'page_size': 2})
+        ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(res.data['count'], len(matches))
+        self.assertEqual(len(ids), len(matches))
+        self.assertEqual(set(ids), matches)
+
+    def test_list_recipes_sparse_fields(self):
+        """
+        ?fields= limits the output and skips the related prefetches
+        """
+        self.payload_KG.tags.add(Tag.objects.create(user=self.user, name='A'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': self.payload_KG.id, 'title': self.payload_KG.title}])
+
+    def test_list_recipes_sparse_fields_ignores_unknown(self):
+        """
+        Unknown names in ?fields= are ignored
+        """
+        res = self.client.get(RECIPE_URL, {'fields': 'title,secret'})
+
+        self.assertEqual(res.data['results'],
+                         [{'title': self.payload_KG.title}])
+
+    def test_list_recipes_expanded(self):
+        """
+        ?expand= nests tag and ingredient objects without extra queries
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        self.payload_KG.tags.add(tag)
+        self.payload_KG.ingredients.add(ingredient)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL, {'expand': 'ingredients,tags'})
+
+        result = res.data['results'][0]
+        self.assertEqual(result['tags'][0]['name'], tag.name)
+        self.assertEqual(result['ingredients'][0]['name'], ingredient.name)
+        self.assertIn('price', result)
+
+    def test_list_recipes_fields_and_expand(self):
+        """
+        Sparse fields and expansion combine, prefetching only what is shown
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.payload_KG.tags.add(tag)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL, {
+                'fields': 'id,tags', 'expand': 'tags'})
+
+        result = res.data['results'][0]
+        self.assertEqual(set(result), {'id', 'tags'})
+        self.assertEqual(result['tags'][0]['name'], tag.name)
+
+    def test_create_recipe_ignores_fields_param(self):
+        """
+        ?fields= and ?expand= only shape reads, never writes
+        """
+        payload = {
+            'title': 'Toast', 'time_minutes': 2, 'price': '1.00',
+            'tags': [], 'ingredients': [],
+        }
+
+        res = self.client.post(RECIPE_URL + '?fields=id', payload,
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', res.data)
+
+    def test_retrieve_recipe_other_user_not_found(self):
+        """
+        Users cannot retrieve another user's recipe
+        """
+        recipe = sample_recipe(user=self.private_user)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_recipes_ndjson(self):
+        """
+        The export streams one JSON object per recipe with tag and
+        ingredient names, limited to the user's own recipes
+        """
+        recipe = sample_recipe(user=self.user, title='Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice'))
+        sample_recipe(user=self.private_user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in
+                b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.payload_KG.id, recipe.id])
+        self.assertEqual(rows[1]['title'], 'Curry')
+        self.assertEqual(rows[1]['tags'], ['Vegan'])
+        self.assertEqual(rows[1]['ingredients'], ['Rice'])
+
+    def test_export_recipes_csv(self):
+        """
+        ?type=csv streams a header row then one row per recipe
+        """
+        recipe = sample_recipe(user=self.user, title='Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'),
+                        Tag.objects.create(user=self.user, name='Hot'))
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.reader(
+            b''.join(res.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:2], ['id', 'title'])
+        self.assertEqual(rows[-1][1], 'Curry')
+        self.assertEqual(rows[-1][6], 'Hot;Vegan')
+
+    def test_export_recipes_invalid_type(self):
+        """
+        An unknown export type is rejected
+        """
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_recipes_queries_per_chunk(self):
+        """
+        Names are fetched once per chunk of recipes, not once per recipe
+        """
+        for i in range(5):
+            sample_recipe(user=self.user, title='Recipe %d' % i)
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            with CaptureQueriesContext(connection) as queries:
+                content = b''.join(res.streaming_content)
+
+        self.assertEqual(len(content.splitlines()), 6)
+        # One recipe query, then a tag and an ingredient query per chunk
+        self.assertEqual(len(queries), 1 + 2 * 3)
@@ -1,14 +1,23 @@
+from base64 import b64decode
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Recipe
+from recipe.cache import response_cache
 from recipe.serializers import TagSerializer
+from recipe.views import TagViewSet
 
 TAGS_URL = reverse('recipe:tag-list')
+SUGGEST_URL = reverse('recipe:tag-suggest')
 
 
 class PublicTagsApiTests(TestCase):
@@ -42,6 +51,7 @@ class PrivateTagsApiTests(TestCase):
         self.tag_payload_bad = {'name': ''}
         self.client = APIClient()
         self.client.force_authenticate(self.user)
+        response_cache.clear()
 
     def test_get_tags_success(self):
         """
@@ -51,11 +61,11 @@ class PrivateTagsApiTests(TestCase):
         Tag.objects.create(user=self.user, name='Thai')
 
         res = self.client.get(TAGS_URL)
-        tags = Tag.objects.all().order_by('-name')
+        tags = Tag.objects.all().order_by('-name', '-id')
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_tags_limited_to_user_success(self):
         """
@@ -72,8 +82,155 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+
+    def test_get_tags_paginated_by_cursor(self):
+        """
+        Tags are returned in pages that can be walked with the next cursor
+        """
+        for name in ('Asian', 'Breakfast', 'Comfort', 'Dessert', 'Easy'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            names.extend(tag['name'] for tag in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            names, ['Easy', 'Dessert', 'Comfort', 'Breakfast', 'Asian'])
+
+    def test_get_tags_duplicate_names_paginated_once(self):
+        """
+        Tags sharing a name are each returned exactly once across pages
+        """
+        tags = [Tag.objects.create(user=self.user, name='Vegan')
+                for _ in range(3)]
+
+        res = self.client.get(TAGS_URL, {'page_size': 1})
+        ids = [tag['id'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids.extend(tag['id'] for tag in res.data['results'])
+
+        self.assertEqual(ids, sorted((tag.id for tag in tags), reverse=True))
+
+    def test_get_tags_offset_limited_to_duplicate_names(self):
+        """
+        Cursors seek by name, only counting past tags that share a name
+        """
+        for i in range(20):
+            Tag.objects.create(user=self.user, name='Tag %02d' % i)
+        for _ in range(3):
+            Tag.objects.create(user=self.user, name='Tag 10')
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        ids = [tag['id'] for tag in res.data['results']]
+        offsets = []
+        while res.data['next']:
+            cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+            offsets.append(int(parse_qs(b64decode(cursor).decode()).get(
+                'o', ['0'])[0]))
+            res = self.client.get(res.data['next'])
+            ids.extend(tag['id'] for tag in res.data['results'])
+
+        self.assertEqual(sorted(ids), sorted(
+            Tag.objects.filter(user=self.user).values_list('id', flat=True)))
+        # Only the page boundaries inside the four tags named 'Tag 10' need
+        # an offset, and it never exceeds the size of that run
+        self.assertEqual(len([offset for offset in offsets if offset]), 2)
+        self.assertLess(max(offsets), 4)
+
+    def test_get_tags_served_from_cache(self):
+        """
+        Repeated tag lists are served from the cache without queries
+        """
+        Tag.objects.create(user=self.user, name='Charcuterie')
+
+        first = self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_create_tag_invalidates_cache(self):
+        """
+        Creating a tag through the API invalidates the cached list
+        """
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, self.tag_payload_good)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'],
+                         self.tag_payload_good['name'])
+
+    def test_write_during_list_not_cached_as_current(self):
+        """
+        A list read before a concurrent write is not served after it
+        """
+        list_tags = TagViewSet.paginate_queryset
+
+        def list_then_write(view, queryset):
+            page = list_tags(view, queryset)
+            Tag.objects.create(user=self.user, name='Vegan')
+            return page
+
+        with patch.object(TagViewSet, 'paginate_queryset', list_then_write):
+            self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+
+    def test_tag_changes_invalidate_cache(self):
+        """
+        Renaming or deleting a tag outside the API invalidates the cache
+        """
+        tag = Tag.objects.create(user=self.user, name='Charcuterie')
+        self.client.get(TAGS_URL)
+
+        tag.name = 'Cheese'
+        tag.save()
+        renamed = self.client.get(TAGS_URL)
+        tag.delete()
+        deleted = self.client.get(TAGS_URL)
+
+        self.assertEqual(renamed.data['results'][0]['name'], 'Cheese')
+        self.assertEqual(deleted.data['results'], [])
+
+    def test_cache_scoped_to_user(self):
+        """
+        A cached list for one user is never served to another
+        """
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass')
+        Tag.objects.create(user=other_user, name='Southern')
+        self.client.get(TAGS_URL)
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'Southern')
+
+    def test_get_tags_not_modified(self):
+        """
+        Tag lists honour If-None-Match until a tag is created
+        """
+        res = self.client.get(TAGS_URL)
+        cached = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.client.post(TAGS_URL, self.tag_payload_good)
+        fresh = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
 
     def test_create_tag_success(self):
         """
@@ -94,3 +251,127 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, self.tag_payload_bad)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.features.can_return_ids_from_bulk_insert,
+                'Needs ids returned from a bulk INSERT')
+    def test_bulk_create_tags_success(self):
+        """
+        Users can create many tags with a single request and INSERT
+        """
+        payload = [{'name': 'Tag %d' % i} for i in range(50)]
+
+        with self.assertNumQueries(1):
+            res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         [tag['name'] for tag in payload])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 50)
+
+    @patch.object(connection.features, 'can_return_ids_from_bulk_insert',
+                  False)
+    def test_bulk_create_tags_without_returned_ids(self):
+        """
+        Bulk created tags come back with their ids on databases that
+        cannot return them from a bulk INSERT
+        """
+        payload = [{'name': 'Tag %d' % i} for i in range(3)]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(tag['id'], tag['name']) for tag in res.data],
+            list(Tag.objects.filter(user=self.user).order_by('id')
+                 .values_list('id', 'name')))
+
+    def test_bulk_create_tags_invalid_item_failure(self):
+        """
+        A single invalid tag rejects the whole batch by default
+        """
+        payload = [self.tag_payload_good, self.tag_payload_bad]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_tags_partial_success(self):
+        """
+        With allow_partial the valid tags are created and errors reported
+        """
+        payload = [self.tag_payload_good, self.tag_payload_bad]
+
+        res = self.client.post(TAGS_URL + '?allow_partial=true', payload,
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 1)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('name', res.data['errors'][0]['errors'])
+        self.assertTrue(Tag.objects.filter(
+            user=self.user, name=self.tag_payload_good['name']).exists())
+
+    def test_bulk_create_tags_too_many_failure(self):
+        """
+        Batches larger than the configured maximum are rejected
+        """
+        payload = [self.tag_payload_good] * 3
+
+        with patch.object(TagViewSet, 'bulk_create_max', 2):
+            res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_get_tags_assigned_only(self):
+        """
+        assigned_only limits the list to tags used by a recipe
+        """
+        used = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Eggs', time_minutes=5, price=2.00)
+        recipe.tags.add(used)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([tag['id'] for tag in res.data['results']],
+                         [used.id])
+
+    def test_get_tags_assigned_only_unique(self):
+        """
+        A tag used by several recipes is only listed once
+        """
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        for title in ('Eggs', 'Pancakes'):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=2.00)
+            recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_suggest_tags_by_prefix(self):
+        """
+        Tag suggestions match name prefixes case-insensitively
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(SUGGEST_URL, {'q': 'VEG'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Vegan', 'Vegetarian'])
+
+    def test_suggest_tags_invalid_limit_failure(self):
+        """
+        A non-numeric limit is rejected
+        """
+        res = self.client.get(SUGGEST_URL, {'q': 'veg', 'limit': 'all'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
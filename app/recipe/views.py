@@ -1,31 +1,140 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Exists, OuterRef, \
+    prefetch_related_objects
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.response import Response
 
+from core.db.router import ReplicaReadMixin
 from core.models import Tag, Ingredient, Recipe
-from .serializers import TagSerializer, IngredientSerializer, RecipeSerializer
+from user.authentication import CachedTokenAuthentication
+from .cache import response_cache
+from .export import iter_csv, iter_ndjson, iter_recipes
+from .mixins import CachedListMixin, ConditionalGetMixin
+from .pagination import RecipeAttrCursorPagination, RecipeCursorPagination, \
+    RecipeSearchPagination
+from .search import search_recipes, suggest_names, update_search_vectors
+from .serializers import TagSerializer, IngredientSerializer, \
+    RecipeSerializer, RecipeDetailSerializer
 
 
-class BaseRecipeAttrViewSet(mixins.ListModelMixin,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            ConditionalGetMixin,
+                            CachedListMixin,
+                            mixins.ListModelMixin,
                             mixins.CreateModelMixin,
                             viewsets.GenericViewSet):
     """
     A base ViewSet for Recipe resources
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    bulk_create_max = 1000
+    suggest_limit = 10
+    suggest_limit_max = 25
 
     def get_queryset(self):
         """
-        Return objects for the current authenticated user only
+        Return objects for the current authenticated user only, limited to
+        those used by at least one recipe when ?assigned_only=1 is passed
         """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.request.query_params.get('assigned_only') in ('1', 'true'):
+            m2m = Recipe._meta.get_field(self.recipe_field)
+            through, column = m2m.remote_field.through, m2m.m2m_reverse_name()
+            queryset = queryset.annotate(assigned=Exists(
+                through.objects.filter(**{column: OuterRef('pk')})
+            )).filter(assigned=True)
+        return queryset.order_by('-name', '-id')
+
+    def create(self, request, *args, **kwargs):
+        """
+        Create a new object, or many objects at once when the request body
+        is a JSON list. Pass ?allow_partial=true to create the valid items
+        of a list and report the invalid ones instead of rejecting it all
+        """
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > self.bulk_create_max:
+            raise ValidationError(
+                'Cannot create more than %d objects per request'
+                % self.bulk_create_max)
+
+        if request.query_params.get('allow_partial') not in ('true', '1'):
+            serializer = self.get_serializer(data=request.data, many=True)
+            serializer.is_valid(raise_exception=True)
+            objs = self.perform_bulk_create(serializer.validated_data)
+            return Response(self.get_serializer(objs, many=True).data,
+                            status=status.HTTP_201_CREATED)
+
+        valid, errors = [], []
+        for index, item in enumerate(request.data):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        objs = self.perform_bulk_create(valid)
+        return Response(
+            {
+                'created': self.get_serializer(objs, many=True).data,
+                'errors': errors,
+            },
+            status=status.HTTP_201_CREATED if objs
+            else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Autocomplete names for ?q=, returning at most ?limit= id/name pairs
+        """
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            return Response([])
+        try:
+            limit = int(request.query_params.get('limit', self.suggest_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer'})
+        limit = max(1, min(limit, self.suggest_limit_max))
+
+        queryset = suggest_names(
+            self.queryset.filter(user=request.user), terms)
+        return Response(list(queryset.values('id', 'name')[:limit]))
 
     def perform_create(self, serializer):
         """
         Create a new object
         """
         serializer.save(user=self.request.user)
+        response_cache.bump_version(self.request.user.pk)
+
+    def perform_bulk_create(self, validated_data):
+        """
+        Create many objects with a single INSERT where the database returns
+        the new ids, otherwise one at a time
+        """
+        if not validated_data:
+            return []
+        model = self.queryset.model
+        objs = [
+            model(user=self.request.user, **attrs) for attrs in validated_data
+        ]
+        db = model.objects.db
+        if connections[db].features.can_return_ids_from_bulk_insert:
+            model.objects.bulk_create(objs)
+        else:
+            with transaction.atomic(using=db):
+                for obj in objs:
+                    obj.save()
+        response_cache.bump_version(self.request.user.pk)
+        return objs
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -34,6 +143,7 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -42,19 +152,234 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     """
     All views for the Recipe resource. Will allow all management actions.
     """
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    bulk_create_max = 500
+    export_chunk_size = 500
+    export_types = {
+        'ndjson': (iter_ndjson, 'application/x-ndjson', 'recipes.ndjson'),
+        'csv': (iter_csv, 'text/csv', 'recipes.csv'),
+    }
 
     def get_queryset(self):
         """
-        Retrieve the recipes for the authenticated user
+        Retrieve the recipes for the authenticated user, prefetching the
+        related ids so serialization costs a fixed number of queries.
+
+        ?tags=1,2 and ?ingredients=3 limit the list to recipes linked to
+        any of the given ids, or to all of them with ?match=all. ?search=
+        limits it to recipes matching the terms, best matches first
+        """
+        queryset = self.queryset.filter(user=self.request.user)
+        match_all = self.request.query_params.get('match') == 'all'
+        for field in ('tags', 'ingredients'):
+            ids = self._params_to_ints(field)
+            if ids:
+                queryset = self.filter_related(
+                    queryset, field, ids, match_all)
+
+        ordering = ('-id',)
+        terms = self.search_terms()
+        if terms:
+            queryset = search_recipes(queryset, terms)
+            if 'rank' in queryset.query.annotations:
+                ordering = ('-rank', '-id')
+
+        return self.shape_queryset(queryset).order_by(*ordering)
+
+    def search_terms(self):
+        """
+        Return the ?search= terms of a list request, or an empty string
+        """
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('search', '').strip()
+
+    @property
+    def paginator(self):
+        """
+        Page searches by offset and other lists by cursor
+        """
+        if not hasattr(self, '_paginator'):
+            self._paginator = RecipeSearchPagination() \
+                if self.search_terms() else self.pagination_class()
+        return self._paginator
+
+    def shape_queryset(self, queryset):
+        """
+        Load only what the serializer will output: prefetch the related
+        objects it includes and, for reads, defer the columns it leaves out
+        """
+        fields = self.get_serializer().fields
+        related = [name for name in ('ingredients', 'tags') if name in fields]
+        queryset = queryset.prefetch_related(*related)
+
+        if self.request.method in SAFE_METHODS:
+            columns = {
+                field.name for field in Recipe._meta.concrete_fields
+                if field.name in fields
+            }
+            queryset = queryset.only('id', *columns)
+        return queryset
+
+    def get_serializer_class(self):
+        """
+        Nest ingredients and tags when retrieving a single recipe
+        """
+        if self.action == 'retrieve':
+            return RecipeDetailSerializer
+        return self.serializer_class
+
+    def _params_to_ints(self, name):
+        """
+        Convert a comma separated id list query parameter to a set of ints
+        """
+        value = self.request.query_params.get(name)
+        if not value:
+            return set()
+        try:
+            return {int(pk) for pk in value.split(',')}
+        except ValueError:
+            raise ValidationError(
+                {name: 'Expected a comma separated list of ids'})
+
+    def filter_related(self, queryset, field, ids, match_all):
+        """
+        Filter recipes through the link table of a M2M field. The "all"
+        match is a single GROUP BY/HAVING over the link rows rather than a
+        join per id
+        """
+        m2m = Recipe._meta.get_field(field)
+        through, column = m2m.remote_field.through, m2m.m2m_reverse_name()
+        links = through.objects.filter(**{column + '__in': ids})
+        if match_all:
+            links = links.values('recipe_id').annotate(
+                matched=Count(column)).filter(matched=len(ids))
+        return queryset.filter(pk__in=links.values('recipe_id'))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a single recipe, honouring conditional GET headers
+        """
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the user's whole recipe book as NDJSON, or as CSV with
+        ?type=csv, without loading it into memory
+        """
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in self.export_types:
+            raise ValidationError(
+                {'type': 'Expected one of: %s'
+                 % ', '.join(sorted(self.export_types))})
+        render, content_type, filename = self.export_types[export_type]
+
+        rows = iter_recipes(self.queryset.filter(user=request.user),
+                            self.export_chunk_size)
+        response = StreamingHttpResponse(render(rows),
+                                         content_type=content_type)
+        response['Content-Disposition'] = \
+            'attachment; filename="%s"' % filename
+        return response
+
+    def perform_create(self, serializer):
+        """
+        Create a new recipe owned by the authenticated user
         """
-        return self.queryset.filter(user=self.request.user)
+        serializer.save(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        """
+        Create a new recipe, or many recipes at once when the request body
+        is a JSON list
+        """
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > self.bulk_create_max:
+            raise ValidationError(
+                'Cannot create more than %d recipes per request'
+                % self.bulk_create_max)
+
+        context = self.get_serializer_context()
+        context['related_objects'] = self.resolve_related_objects(
+            request.data)
+        serializer = self.get_serializer_class()(
+            data=request.data, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        recipes = self.perform_bulk_create(serializer.validated_data)
+        return Response(self.get_serializer(recipes, many=True).data,
+                        status=status.HTTP_201_CREATED)
+
+    def resolve_related_objects(self, items):
+        """
+        Fetch every ingredient and tag referenced by a batch of recipes
+        with one query per model, limited to the user's own objects
+        """
+        related = {}
+        for field, model in (('ingredients', Ingredient), ('tags', Tag)):
+            ids = set()
+            for item in items:
+                values = item.get(field) if isinstance(item, dict) else None
+                if not isinstance(values, list):
+                    continue
+                for value in values:
+                    try:
+                        ids.add(int(value))
+                    except (TypeError, ValueError):
+                        pass
+            related[model] = model.objects.filter(
+                user=self.request.user).in_bulk(ids)
+        return related
+
+    def perform_bulk_create(self, validated_data):
+        """
+        Insert a batch of recipes and their ingredient and tag links with
+        bulk INSERTs
+        """
+        recipes, links = [], []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            links.append((attrs.pop('ingredients'), attrs.pop('tags')))
+            recipes.append(Recipe(user=self.request.user, **attrs))
+
+        db = Recipe.objects.db
+        with transaction.atomic(using=db):
+            if connections[db].features.can_return_ids_from_bulk_insert:
+                Recipe.objects.bulk_create(recipes)
+            else:
+                for recipe in recipes:
+                    recipe.save()
+
+            ingredient_links, tag_links = [], []
+            for recipe, (ingredients, tags) in zip(recipes, links):
+                ingredient_links.extend(
+                    Recipe.ingredients.through(
+                        recipe_id=recipe.pk, ingredient_id=ingredient_id)
+                    for ingredient_id in {obj.pk for obj in ingredients}
+                )
+                tag_links.extend(
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                    for tag_id in {obj.pk for obj in tags}
+                )
+            Recipe.ingredients.through.objects.bulk_create(ingredient_links)
+            Recipe.tags.through.objects.bulk_create(tag_links)
+            update_search_vectors(recipe.pk for recipe in recipes)
+
+        response_cache.bump_version(self.request.user.pk)
+        prefetch_related_objects(recipes, 'ingredients', 'tags')
+        return recipes
@@ -0,0 +1,74 @@
+import copy
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """
+    Caches (user, token) pairs by a hash of the token key, so raw keys
+    never end up in a shared cache. Entries live in a bounded in-process
+    LRU and, optionally, a shared Django cache that other processes can
+    fill from
+    """
+
+    def __init__(self, MAX_ENTRIES=10000, TIMEOUT=60, CACHE_ALIAS=None):
+        self.local = LRUCache(max_entries=MAX_ENTRIES, timeout=TIMEOUT)
+        self.shared = caches[CACHE_ALIAS] if CACHE_ALIAS else None
+        self.timeout = TIMEOUT
+
+    @staticmethod
+    def make_key(token_key):
+        return 'auth:token:%s' % hashlib.sha256(
+            token_key.encode('utf-8')).hexdigest()
+
+    def get(self, token_key):
+        cache_key = self.make_key(token_key)
+        credentials = self.local.get(cache_key)
+        if credentials is None and self.shared is not None:
+            credentials = self.shared.get(cache_key)
+            if credentials is not None:
+                self.local.set(cache_key, credentials)
+        return credentials
+
+    def set(self, token_key, credentials):
+        cache_key = self.make_key(token_key)
+        self.local.set(cache_key, credentials)
+        if self.shared is not None:
+            self.shared.set(cache_key, credentials, self.timeout)
+
+    def invalidate(self, token_key):
+        cache_key = self.make_key(token_key)
+        self.local.delete(cache_key)
+        if self.shared is not None:
+            self.shared.delete(cache_key)
+
+    def clear(self):
+        self.local.clear()
+
+
+token_cache = TokenCache(**getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers successful lookups, skipping the
+    token/user query on repeat requests. Entries are dropped when the
+    token is deleted or its user is saved (e.g. deactivated), and expire
+    after a bounded TTL in any process that did not see the change
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        # Hand each request its own user object so changes made while
+        # handling one request never leak into another through the cache
+        user, token = credentials
+        return copy.copy(user), token
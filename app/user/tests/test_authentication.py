@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+
+PROFILE_URL = reverse('user:profile')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test token authentication backed by the token cache
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass',
+            name='Testy McTester'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_repeat_requests_skip_token_lookup(self):
+        """
+        Only the first request with a token queries the database
+        """
+        with self.assertNumQueries(1):
+            first = self.client.get(PROFILE_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(PROFILE_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_invalid_token_failure(self):
+        """
+        Unknown tokens are rejected and never cached
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(token_cache.get('invalid'))
+
+    def test_deleted_token_rejected(self):
+        """
+        Deleting a token invalidates its cached credentials
+        """
+        self.client.get(PROFILE_URL)
+        self.token.delete()
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+        Deactivating a user invalidates their cached credentials
+        """
+        self.client.get(PROFILE_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_stale(self):
+        """
+        Updating the profile is reflected on the next cached request
+        """
+        self.client.get(PROFILE_URL)
+        self.client.patch(PROFILE_URL, {'name': 'New Name'})
+
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @patch('core.cache.time.monotonic')
+    def test_cached_credentials_expire(self, monotonic):
+        """
+        Cached credentials are looked up again once their TTL has passed
+        """
+        monotonic.return_value = 0
+        self.client.get(PROFILE_URL)
+
+        monotonic.return_value = token_cache.timeout
+        with self.assertNumQueries(1):
+            res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cache_keys_hash_token(self):
+        """
+        Raw token keys are never used as cache keys
+        """
+        self.assertNotIn(self.token.key, token_cache.make_key(self.token.key))
@@ -0,0 +1,157 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import hasher_pool
+from user.throttling import LoginFailureThrottle, LoginRateThrottle, \
+    UserCreateRateThrottle, throttle_metrics
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+THROTTLE_STATS_URL = reverse('core:throttle-stats')
+
+
+class ThrottlingTests(TestCase):
+    """
+    Test throttling of the public user endpoints
+    """
+
+    def setUp(self):
+        cache.clear()
+        throttle_metrics.clear()
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            email='test@example.com', password='testpass')
+        self.bad_creds = {'email': 'test@example.com', 'password': 'wrong'}
+        self.good_creds = {'email': 'test@example.com', 'password': 'testpass'}
+
+    @patch.object(LoginFailureThrottle, 'rate', '2/min', create=True)
+    def test_repeated_bad_credentials_rejected_before_hashing(self):
+        """
+        After too many failures, attempts are refused without hashing
+        """
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, self.bad_creds)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch.object(hasher_pool, 'run') as run:
+            with self.assertNumQueries(0):
+                res = self.client.post(TOKEN_URL, self.good_creds)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        run.assert_not_called()
+
+    @patch.object(LoginFailureThrottle, 'rate', '2/min', create=True)
+    def test_failures_counted_per_email(self):
+        """
+        Failures for one email do not lock out another
+        """
+        get_user_model().objects.create_user(
+            email='other@example.com', password='testpass')
+        for _ in range(2):
+            self.client.post(TOKEN_URL, self.bad_creds)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@example.com', 'password': 'testpass'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.object(LoginFailureThrottle, 'rate', '2/min', create=True)
+    def test_successful_login_resets_failures(self):
+        """
+        A successful login clears earlier failures
+        """
+        self.client.post(TOKEN_URL, self.bad_creds)
+        self.client.post(TOKEN_URL, self.good_creds)
+        self.client.post(TOKEN_URL, self.bad_creds)
+
+        res = self.client.post(TOKEN_URL, self.good_creds)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.object(LoginFailureThrottle, 'rate', '1/min', create=True)
+    def test_failures_window_slides(self):
+        """
+        Failures older than the window no longer count
+        """
+        with patch.object(LoginFailureThrottle, 'timer', return_value=0):
+            self.client.post(TOKEN_URL, self.bad_creds)
+
+        with patch.object(LoginFailureThrottle, 'timer', return_value=61):
+            res = self.client.post(TOKEN_URL, self.good_creds)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.object(LoginRateThrottle, 'rate', '1/min', create=True)
+    def test_login_rate_limited(self):
+        """
+        Token requests are limited per client address
+        """
+        self.client.post(TOKEN_URL, self.good_creds)
+
+        res = self.client.post(TOKEN_URL, self.good_creds)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch.object(UserCreateRateThrottle, 'rate', '1/hour', create=True)
+    def test_user_create_rate_limited(self):
+        """
+        Sign-ups are limited per client address
+        """
+        self.client.post(CREATE_USER_URL, {
+            'email': 'new1@example.com', 'password': 'testpass'})
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'new2@example.com', 'password': 'testpass'})
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(get_user_model().objects.filter(
+            email='new2@example.com').exists())
+
+    @patch.object(LoginFailureThrottle, 'rate', '1/min', create=True)
+    def test_rejections_record_avoided_work(self):
+        """
+        Each rejection is counted with the average cost it avoided
+        """
+        self.client.post(TOKEN_URL, self.bad_creds)
+        self.client.post(TOKEN_URL, self.bad_creds)
+        self.client.post(TOKEN_URL, self.bad_creds)
+
+        stats = throttle_metrics.stats()['login']
+
+        self.assertEqual(stats['attempts'], 1)
+        self.assertEqual(stats['rejected'], 2)
+        self.assertGreater(stats['seconds_avoided'], 0)
+        self.assertGreater(stats['queries_avoided'], 0)
+
+    @patch.object(LoginFailureThrottle, 'rate', '1/min', create=True)
+    def test_rejections_reported_to_staff(self):
+        """
+        Staff can read the rejection counts from the status endpoint
+        """
+        self.client.post(TOKEN_URL, self.bad_creds)
+        self.client.post(TOKEN_URL, self.bad_creds)
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass')
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(THROTTLE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['login']['attempts'], 1)
+        self.assertEqual(res.data['login']['rejected'], 1)
+
+    def test_non_object_body_rejected(self):
+        """
+        A JSON body that is not an object is a bad request, not an error
+        """
+        res = self.client.post(TOKEN_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle
+
+
+class ThrottleMetrics:
+    """
+    Tracks what throttled endpoints cost per attempt and how many attempts
+    were rejected, to estimate the hashing time and queries throttling
+    saved. Counters are per process
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes = defaultdict(
+            lambda: {'attempts': 0, 'seconds': 0.0, 'queries': 0,
+                     'rejected': 0})
+
+    @contextmanager
+    def measure(self, scope):
+        """
+        Record the wall time and number of queries of an attempt
+        """
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count):
+            try:
+                yield
+            finally:
+                seconds = time.perf_counter() - start
+                with self._lock:
+                    totals = self._scopes[scope]
+                    totals['attempts'] += 1
+                    totals['seconds'] += seconds
+                    totals['queries'] += len(queries)
+
+    def record_rejection(self, scope):
+        with self._lock:
+            self._scopes[scope]['rejected'] += 1
+
+    def stats(self):
+        """
+        Return per-scope rejections and the work they are estimated to
+        have avoided, based on the average cost of admitted attempts
+        """
+        with self._lock:
+            stats = {}
+            for scope, totals in self._scopes.items():
+                attempts = totals['attempts'] or 1
+                stats[scope] = {
+                    'attempts': totals['attempts'],
+                    'rejected': totals['rejected'],
+                    'seconds_avoided':
+                        totals['rejected'] * totals['seconds'] / attempts,
+                    'queries_avoided':
+                        totals['rejected'] * totals['queries'] / attempts,
+                }
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+
+
+throttle_metrics = ThrottleMetrics()
+
+
+class MeteredThrottleMixin:
+    """
+    Count each rejection against the view's metrics scope
+    """
+
+    def allow_request(self, request, view):
+        self.metrics_scope = getattr(view, 'throttle_metrics_scope', None)
+        return super().allow_request(request, view)
+
+    def throttle_failure(self):
+        if self.metrics_scope:
+            throttle_metrics.record_rejection(self.metrics_scope)
+        return super().throttle_failure()
+
+
+class LoginRateThrottle(MeteredThrottleMixin, AnonRateThrottle):
+    """
+    Sliding-window limit on token requests per client address
+    """
+    scope = 'login'
+
+
+class UserCreateRateThrottle(MeteredThrottleMixin, AnonRateThrottle):
+    """
+    Sliding-window limit on sign-ups per client address
+    """
+    scope = 'user_create'
+
+
+class LoginFailureThrottle(MeteredThrottleMixin, SimpleRateThrottle):
+    """
+    Sliding-window limit on failed logins per client address and email.
+    Only failures recorded by the view count, and once the limit is hit
+    further attempts are turned away before any password is hashed
+    """
+    scope = 'login_failure'
+
+    def get_cache_key(self, request, view):
+        # The body may be any JSON value; only an object carries an email
+        data = request.data if isinstance(request.data, dict) else {}
+        email = str(data.get('email', '')).strip().lower()
+        ident = '%s:%s' % (
+            self.get_ident(request),
+            hashlib.sha256(email.encode('utf-8')).hexdigest())
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def throttle_success(self):
+        # Admitting a request is not a failure, so leave the history alone
+        return True
+
+    def record_failure(self, request, view):
+        """
+        Add a failed attempt to the sliding window
+        """
+        key = self.get_cache_key(request, view)
+        now = self.timer()
+        history = [
+            stamp for stamp in self.cache.get(key, [])
+            if stamp > now - self.duration
+        ]
+        history.insert(0, now)
+        self.cache.set(key, history, self.duration)
+
+    def reset(self, request, view):
+        """
+        Forget failures after a successful login
+        """
+        self.cache.delete(self.get_cache_key(request, view))
@@ -1,8 +1,15 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.db.router import ReplicaReadMixin
+from .authentication import CachedTokenAuthentication
 from .serializers import UserSerializer, AuthTokenSerializer
+from .throttling import LoginFailureThrottle, LoginRateThrottle, \
+    UserCreateRateThrottle, throttle_metrics
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,6 +17,12 @@ class CreateUserView(generics.CreateAPIView):
     An endpoint to create new users
     """
     serializer_class = UserSerializer
+    throttle_classes = (UserCreateRateThrottle,)
+    throttle_metrics_scope = 'user_create'
+
+    def create(self, request, *args, **kwargs):
+        with throttle_metrics.measure(self.throttle_metrics_scope):
+            return super().create(request, *args, **kwargs)
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -18,14 +31,37 @@ class CreateTokenView(ObtainAuthToken):
     """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginRateThrottle, LoginFailureThrottle)
+    throttle_metrics_scope = 'login'
+
+    def post(self, request, *args, **kwargs):
+        """
+        Issue a token, counting bad credentials towards the failure limit
+        """
+        serializer = self.serializer_class(data=request.data,
+                                           context={'request': request})
+        with throttle_metrics.measure(self.throttle_metrics_scope):
+            valid = serializer.is_valid()
+
+        failures = LoginFailureThrottle()
+        if not valid:
+            if any(error.code == 'authentication' for error in
+                   serializer.errors.get('non_field_errors', [])):
+                failures.record_failure(request, self)
+            raise ValidationError(serializer.errors)
+
+        failures.reset(request, self)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+        return Response({'token': token.key})
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """
     An endpoint for authenticated users to manage their information
     """
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):